@@ -1,23 +1,33 @@
 import tkinter as tk
 from tkinter import ttk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import pandas as pd
-import numpy as np
+from chart_renderer import (
+    ChartView,
+    render_task_charts,
+    render_goal_overview,
+    render_recovery_overview
+)
+from datetime import date
+from date_codec import from_day
+from recovery_stats import WINDOWS
+
+# Days of recovery history the insights tab covers, ending today
+RECOVERY_RANGE_DAYS = 90
 
 class Analytics:
-    def __init__(self, parent, conn):
+    tables = ('tasks', 'goals', 'recovery_logs')
+
+    def __init__(self, parent, db, charts):
         self.parent = parent
-        self.conn = conn
-        self.cursor = conn.cursor()
-        self.setup_style()
+        self.db = db
+        self.charts = charts
+        self.chart_views = {}
+        self.recovery_insights = None
+        self.tab_versions = {}
         self.setup_ui()
+        # Stat cards are queued before any chart query, so they paint first
         self.load_analytics()
-
-    def setup_style(self):
-        # Modern color palette
-        self.colors = ['#4CAF50', '#2196F3', '#FF9800', '#E91E63', '#9C27B0']
-        plt.style.use('ggplot')  # Using built-in modern style
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.on_tab_changed()
 
     def setup_ui(self):
         self.notebook = ttk.Notebook(self.parent)
@@ -32,164 +42,134 @@ class Analytics:
         self.notebook.add(self.goals_frame, text='🎯 Goal Progress')
         self.notebook.add(self.recovery_frame, text='📈 Recovery Insights')
 
-        self.setup_task_analytics()
-        self.setup_goals_analytics()
-        self.setup_recovery_analytics()
+        # Tables each tab's chart is drawn from, and the query that loads it
+        self.tabs = {
+            str(self.task_frame): (('tasks',), self.setup_task_analytics),
+            str(self.goals_frame): (('goals',), self.setup_goals_analytics),
+            str(self.recovery_frame): (('recovery_logs',), self.setup_recovery_analytics),
+        }
+
+        # Create modern stats cards using ttk frames
+        self.stats_frame = ttk.Frame(self.parent)
+        self.stats_frame.pack(fill=tk.X, pady=10, padx=10)
+        self.show_loading(self.stats_frame)
+
+    def on_tab_changed(self, event=None):
+        # Tabs are only loaded once they are looked at, and a tab that was
+        # loaded before is kept as is until one of its tables changes
+        tab = self.notebook.select()
+        if tab not in self.tabs:
+            return
+        tables, setup = self.tabs[tab]
+        version = self.db.data_version(tables)
+        if self.tab_versions.get(tab) != version:
+            self.tab_versions[tab] = version
+            setup()
+
+    def refresh(self):
+        self.load_analytics()
+        # Hidden tabs notice their stale data when they are selected
+        self.on_tab_changed()
+
+    def show_loading(self, frame):
+        # Placeholder while the query runs on the database thread; a tab
+        # that already shows a chart keeps it until the new one arrives
+        if str(frame) in self.chart_views:
+            return
+        self.clear_frame(frame)
+        ttk.Label(frame, text="Loading…", font=('Helvetica', 12)).pack(expand=True)
+
+    def show_chart(self, frame):
+        chart = self.chart_views.get(str(frame))
+        if chart is None:
+            self.clear_frame(frame)
+            chart = ChartView(frame, self.charts)
+            chart.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            self.chart_views[str(frame)] = chart
+        return chart
+
+    def clear_frame(self, frame):
+        for widget in frame.winfo_children():
+            widget.destroy()
 
     def setup_task_analytics(self):
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5), facecolor='none')
-        fig.patch.set_facecolor('none')
-        canvas = FigureCanvasTkAgg(fig, self.task_frame)
-        
-        # Task completion donut chart
-        self.cursor.execute('''
-            SELECT category, COUNT(*) as total,
-            SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) as completed
-            FROM tasks GROUP BY category
-        ''')
-        data = self.cursor.fetchall()
-
-        if data:
-            categories = [row[0] for row in data]
-            completed = [row[2] for row in data]
-            total = [row[1] for row in data]
-            
-            # Create donut chart
-            wedges, texts, autotexts = ax1.pie(
-                completed, 
-                labels=categories,
-                colors=self.colors,
-                autopct='%1.1f%%',
-                wedgeprops=dict(width=0.5)
-            )
-            ax1.set_title('Task Completion by Category', pad=20, color='#333333')
-
-            # Create stacked bar chart
-            df = pd.DataFrame({
-                'Category': categories,
-                'Completed': completed,
-                'Remaining': np.array(total) - np.array(completed)
-            })
-            
-            df.plot(
-                kind='bar',
-                stacked=True,
-                ax=ax2,
-                color=[self.colors[0], '#E0E0E0']
-            )
-            ax2.set_title('Task Status Overview', color='#333333')
-            ax2.legend(loc='upper right')
-            ax2.set_xlabel('')
-            ax2.tick_params(colors='#333333')
-            
-        fig.tight_layout()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.show_loading(self.task_frame)
+        self.db.submit('task_category_stats', callback=self.draw_task_analytics)
+
+    def draw_task_analytics(self, data):
+        # The figure itself is laid out and rendered by a chart process
+        chart = self.show_chart(self.task_frame)
+        chart.render(
+            render_task_charts,
+            [row.category for row in data],
+            [row.completed for row in data],
+            [row.total for row in data]
+        )
 
     def setup_goals_analytics(self):
-        fig = plt.figure(figsize=(12, 5), facecolor='none')
-        fig.patch.set_facecolor('none')
-        canvas = FigureCanvasTkAgg(fig, self.goals_frame)
+        self.show_loading(self.goals_frame)
+        self.db.submit('goals', callback=self.draw_goals_analytics)
 
-        self.cursor.execute('SELECT title, progress FROM goals')
-        data = self.cursor.fetchall()
-
-        if data:
-            titles = [row[0] for row in data]
-            progress = [row[1] for row in data]
-            
-            ax = fig.add_subplot(111)
-            bars = ax.barh(titles, progress, height=0.5)
-            
-            # Add progress percentage inside bars
-            for i, bar in enumerate(bars):
-                width = bar.get_width()
-                ax.text(
-                    min(width + 2, 95),
-                    bar.get_y() + bar.get_height()/2,
-                    f'{progress[i]}%',
-                    va='center',
-                    color='white' if width > 30 else '#333333'
-                )
-                
-            # Style the chart
-            ax.set_xlim(0, 100)
-            ax.set_title('Goal Progress Overview', pad=20, color='#333333')
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.tick_params(colors='#333333')
-            
-            # Add gradient colors
-            for bar, color in zip(bars, self.colors):
-                bar.set_color(color)
-                
-        fig.tight_layout()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    def draw_goals_analytics(self, data):
+        chart = self.show_chart(self.goals_frame)
+        chart.render(
+            render_goal_overview,
+            [row.title for row in data],
+            [row.progress for row in data]
+        )
 
     def setup_recovery_analytics(self):
-        fig = plt.figure(figsize=(12, 6), facecolor='none')
-        fig.patch.set_facecolor('none')
-        canvas = FigureCanvasTkAgg(fig, self.recovery_frame)
-        
-        self.cursor.execute('''
-            SELECT date, energy_level, sleep_hours 
-            FROM recovery_logs 
-            ORDER BY date DESC 
-            LIMIT 14
-        ''')
-        data = self.cursor.fetchall()
-
-        if data:
-            dates = [row[0] for row in data]
-            energy = [row[1] for row in data]
-            sleep = [row[2] for row in data]
-            
-            # Create area chart
-            ax = fig.add_subplot(111)
-            ax.fill_between(dates, energy, alpha=0.3, color=self.colors[0], label='Energy Level')
-            ax.plot(dates, energy, color=self.colors[0], linewidth=2, marker='o')
-            
-            # Add sleep duration as circles
-            ax2 = ax.twinx()
-            ax2.scatter(dates, sleep, color=self.colors[1], s=100, label='Sleep Hours', alpha=0.7)
-            ax2.plot(dates, sleep, color=self.colors[1], alpha=0.3, linestyle='--')
-            
-            # Style the chart
-            ax.set_title('Energy Levels & Sleep Duration', pad=20, color='#333333')
-            ax.spines['top'].set_visible(False)
-            ax.tick_params(axis='x', rotation=45, colors='#333333')
-            ax2.tick_params(colors='#333333')
-            
-            # Add legends
-            lines1, labels1 = ax.get_legend_handles_labels()
-            lines2, labels2 = ax2.get_legend_handles_labels()
-            ax.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
-            
-        fig.tight_layout()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.show_loading(self.recovery_frame)
+        today = date.today().toordinal()
+        self.db.submit('recovery_stats', today - RECOVERY_RANGE_DAYS + 1, today,
+                       callback=self.draw_recovery_analytics)
+
+    def draw_recovery_analytics(self, stats):
+        chart = self.show_chart(self.recovery_frame)
+        chart.render(
+            render_recovery_overview,
+            [from_day(int(day)) for day in stats.days] if stats.logged else [],
+            stats.energy,
+            stats.sleep,
+            stats.rolling[WINDOWS[0]].energy_mean
+        )
+        self.show_recovery_insights(stats)
+
+    def show_recovery_insights(self, stats):
+        # Latest rolling means, how sleep tracks energy, and the activity
+        # with the best energy, under the chart
+        def number(value):
+            return '–' if value != value else f"{value:.1f}"
+
+        means = ' · '.join(
+            f"{window}d {number(stats.rolling[window].energy_mean[-1])}" for window in WINDOWS
+        )
+        text = f"Energy {means}    Sleep/energy r = {number(stats.correlation)}"
+        if stats.by_physical:
+            activity, (energy, _) = max(stats.by_physical.items(), key=lambda item: item[1][0])
+            text += f"    Best activity: {activity} ({number(energy)})"
+
+        if self.recovery_insights is None or not self.recovery_insights.winfo_exists():
+            self.recovery_insights = ttk.Label(self.recovery_frame, font=('Helvetica', 11))
+            self.recovery_insights.pack(fill=tk.X, padx=10, pady=(0, 10))
+        self.recovery_insights.configure(text=text)
 
     def load_analytics(self):
-        # Create modern stats cards using ttk frames
-        stats_frame = ttk.Frame(self.parent)
-        stats_frame.pack(fill=tk.X, pady=10, padx=10)
-
-        self.cursor.execute('''
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) as completed
-            FROM tasks
-        ''')
-        task_stats = self.cursor.fetchone()
-        completion_rate = (task_stats[1] / task_stats[0] * 100) if task_stats[0] > 0 else 0
+        self.db.submit('task_totals', callback=self.show_stat_cards)
+
+    def show_stat_cards(self, task_stats):
+        self.clear_frame(self.stats_frame)
+        completion_rate = (task_stats.completed / task_stats.total * 100) if task_stats.total > 0 else 0
         
         # Create modern stat cards
         cards_data = [
             ("Task Completion Rate", f"{completion_rate:.1f}%"),
-            ("Total Tasks", str(task_stats[0])),
-            ("Completed Tasks", str(task_stats[1]))
+            ("Total Tasks", str(task_stats.total)),
+            ("Completed Tasks", str(task_stats.completed))
         ]
         
         for title, value in cards_data:
-            card = ttk.Frame(stats_frame, style='Card.TFrame', padding=10)
+            card = ttk.Frame(self.stats_frame, style='Card.TFrame', padding=10)
             card.pack(side=tk.LEFT, padx=5, expand=True)
             
             ttk.Label(
@@ -0,0 +1,365 @@
+import multiprocessing
+import os
+import tkinter as tk
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+# Charts are laid out and rasterised by matplotlib's Agg backend in worker
+# processes, so several charts render in parallel on separate cores and the
+# Tk thread only has to blit the finished pixels.
+MAX_RENDER_PROCESSES = 3
+RESIZE_DELAY_MS = 150
+HIGHLIGHT_COLOR = '#FFD54F'
+
+# marks holds one (x0, y0, x1, y1) canvas box per data item, so the app can
+# highlight an item without asking for a new render
+RenderedChart = namedtuple('RenderedChart', 'width height rgba marks', defaults=((),))
+# What ChartView gets back: the chart as binary PPM, ready for Tk
+ChartImage = namedtuple('ChartImage', 'ppm marks')
+
+CHART_COLORS = ['#4CAF50', '#2196F3', '#FF9800', '#E91E63', '#9C27B0']
+
+
+# Worker-side rendering. Everything below up to ChartRenderer runs in the
+# render processes and must stay importable without a display.
+
+def new_figure(width, height, dpi, facecolor=None):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi, facecolor=facecolor)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def rasterise(fig, marks=None):
+    fig.tight_layout()
+    fig.canvas.draw()
+    width, height = fig.canvas.get_width_height(physical=True)
+    # Display boxes are measured from the bottom left, canvas ones from the top
+    boxes = tuple(
+        (float(x0), float(height - y1), float(x1), float(height - y0))
+        for x0, y0, x1, y1 in (marks() if marks else ())
+    )
+    # The only copy made: the buffer has to be pickled back to the app
+    return RenderedChart(width, height, bytes(fig.canvas.buffer_rgba()), boxes)
+
+
+def bar_boxes(bars):
+    return [bar.get_window_extent().extents for bar in bars]
+
+
+def point_boxes(ax, points, size, dpi):
+    # size is a scatter marker area in points squared
+    radius = size ** 0.5 / 2 * dpi / 72 + 3
+    return [
+        (x - radius, y - radius, x + radius, y + radius)
+        for x, y in ax.transData.transform(points.get_offsets())
+    ]
+
+
+def warm_up():
+    # Pays matplotlib's import cost in each worker before the first chart
+    import matplotlib.figure
+    import matplotlib.backends.backend_agg
+    return os.getpid()
+
+
+def render_task_charts(width, height, dpi, categories, completed, total):
+    from matplotlib import style
+
+    with style.context('ggplot'):
+        fig = new_figure(width, height, dpi, facecolor='none')
+        ax1, ax2 = fig.subplots(1, 2)
+
+        if categories:
+            # Task completion donut chart; pie() refuses all-zero wedges,
+            # so until something is completed it says so instead
+            if sum(completed):
+                ax1.pie(
+                    completed,
+                    labels=categories,
+                    colors=CHART_COLORS,
+                    autopct='%1.1f%%',
+                    wedgeprops=dict(width=0.5)
+                )
+            else:
+                ax1.text(0.5, 0.5, 'No completed tasks yet', ha='center', va='center',
+                         color='#333333', transform=ax1.transAxes)
+                ax1.axis('off')
+            ax1.set_title('Task Completion by Category', pad=20, color='#333333')
+
+            # Stacked completed/remaining bars per category
+            remaining = [t - c for t, c in zip(total, completed)]
+            positions = range(len(categories))
+            ax2.bar(positions, completed, color=CHART_COLORS[0], label='Completed')
+            ax2.bar(positions, remaining, bottom=completed, color='#E0E0E0', label='Remaining')
+            ax2.set_xticks(positions)
+            ax2.set_xticklabels(categories, rotation=90)
+            ax2.set_title('Task Status Overview', color='#333333')
+            ax2.legend(loc='upper right')
+            ax2.tick_params(colors='#333333')
+
+        return rasterise(fig)
+
+
+def render_goal_overview(width, height, dpi, titles, progress):
+    from matplotlib import style
+
+    with style.context('ggplot'):
+        fig = new_figure(width, height, dpi, facecolor='none')
+
+        if titles:
+            ax = fig.add_subplot(111)
+            bars = ax.barh(titles, progress, height=0.5)
+
+            # Add progress percentage inside bars
+            for i, bar in enumerate(bars):
+                width = bar.get_width()
+                ax.text(
+                    min(width + 2, 95),
+                    bar.get_y() + bar.get_height()/2,
+                    f'{progress[i]}%',
+                    va='center',
+                    color='white' if width > 30 else '#333333'
+                )
+
+            # Style the chart
+            ax.set_xlim(0, 100)
+            ax.set_title('Goal Progress Overview', pad=20, color='#333333')
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+            ax.tick_params(colors='#333333')
+
+            # Add gradient colors
+            for bar, color in zip(bars, CHART_COLORS):
+                bar.set_color(color)
+
+        return rasterise(fig)
+
+
+def render_recovery_overview(width, height, dpi, dates, energy, sleep, trend):
+    # energy and sleep are daily means with NaN on days nothing was logged;
+    # trend is the rolling mean of energy. Each series is thinned to the
+    # chart's pixel width first, so a long range draws as fast as a short one.
+    from matplotlib import dates as mdates, style
+    from downsample import for_width
+
+    with style.context('ggplot'):
+        fig = new_figure(width, height, dpi, facecolor='none')
+
+        if dates:
+            x = mdates.date2num(dates)
+            energy_x, energy = for_width(x, energy, width)
+            trend_x, trend = for_width(x, trend, width)
+            sleep_x, sleep = for_width(x, sleep, width)
+
+            # Create area chart
+            ax = fig.add_subplot(111)
+            ax.xaxis_date()
+            ax.fill_between(energy_x, energy, alpha=0.3, color=CHART_COLORS[0], label='Energy Level')
+            ax.plot(energy_x, energy, color=CHART_COLORS[0], linewidth=2, marker='o', markersize=3)
+            ax.plot(trend_x, trend, color=CHART_COLORS[3], linewidth=2, label='7-day Average')
+
+            # Add sleep duration as circles
+            ax2 = ax.twinx()
+            ax2.scatter(sleep_x, sleep, color=CHART_COLORS[1], s=30, label='Sleep Hours', alpha=0.7)
+            ax2.plot(sleep_x, sleep, color=CHART_COLORS[1], alpha=0.3, linestyle='--')
+
+            # Style the chart
+            ax.set_title('Energy Levels & Sleep Duration', pad=20, color='#333333')
+            ax.spines['top'].set_visible(False)
+            ax.tick_params(axis='x', rotation=45, colors='#333333')
+            ax2.tick_params(colors='#333333')
+
+            # Add legends
+            lines1, labels1 = ax.get_legend_handles_labels()
+            lines2, labels2 = ax2.get_legend_handles_labels()
+            ax.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
+
+        return rasterise(fig)
+
+
+def render_goal_progress(width, height, dpi, titles, progress):
+    import numpy as np
+    from matplotlib import colormaps, style
+
+    with style.context('dark_background'):
+        fig = new_figure(width, height, dpi)
+        ax = fig.add_subplot(111)
+
+        if titles:
+            colors = colormaps['viridis'](np.linspace(0, 1, len(titles)))
+            bars = ax.barh(titles, progress, color=colors)
+            for bar in bars:
+                width = bar.get_width()
+                ax.text(
+                    width,
+                    bar.get_y() + bar.get_height()/2,
+                    f'{int(width)}%',
+                    va='center',
+                    ha='left' if width < 50 else 'right',
+                    color='white'
+                )
+
+            ax.set_xlabel('Progress (%)')
+            ax.set_title('Goal Progress Overview')
+            ax.grid(True, alpha=0.3)
+            return rasterise(fig, lambda: bar_boxes(bars))
+
+        return rasterise(fig)
+
+
+def render_goal_timeline(width, height, dpi, titles, target_dates):
+    import numpy as np
+    from matplotlib import colormaps, style
+
+    with style.context('dark_background'):
+        fig = new_figure(width, height, dpi)
+        ax = fig.add_subplot(111)
+
+        if titles:
+            colors = colormaps['viridis'](np.linspace(0, 1, len(titles)))
+            # Goals whose target date couldn't be read are shown at today
+            dates = [target or date.today() for target in target_dates]
+            y_positions = range(len(titles))
+            points = ax.scatter(dates, y_positions, c=colors, s=100)
+            ax.set_yticks(y_positions)
+            ax.set_yticklabels(titles)
+            ax.set_xlabel('Target Date')
+            ax.set_title('Goal Timeline')
+            ax.grid(True, alpha=0.3)
+
+            # Rotate date labels for better readability
+            for label in ax.get_xticklabels():
+                label.set_rotation(45)
+                label.set_horizontalalignment('right')
+            return rasterise(fig, lambda: point_boxes(ax, points, 100, dpi))
+
+        return rasterise(fig)
+
+
+def to_ppm(chart, background):
+    # A binary PPM of the rendered pixels, which Tk reads natively through
+    # PhotoImage. PPM has no alpha channel, so see-through pixels are laid
+    # over the background (an RGB triple) here.
+    import numpy as np
+
+    pixels = np.frombuffer(chart.rgba, dtype=np.uint8).reshape(chart.height, chart.width, 4)
+    rgb = pixels[..., :3]
+    alpha = pixels[..., 3:]
+    if alpha.min() < 255:
+        alpha = alpha.astype(np.uint16)
+        background = np.asarray(background, dtype=np.uint16)
+        rgb = ((rgb * alpha + background * (255 - alpha) + 127) // 255).astype(np.uint8)
+    header = f'P6 {chart.width} {chart.height} 255\n'.encode('ascii')
+    return header + np.ascontiguousarray(rgb).tobytes()
+
+
+def render_image(render, background, *args):
+    # Renders a chart for ChartView, converting it in the worker as well
+    chart = render(*args)
+    return ChartImage(to_ppm(chart, background), chart.marks)
+
+
+class ChartRenderer:
+    # App-side handle on the render processes. Processes are spawned rather
+    # than forked so they never inherit the Tk interpreter.
+    def __init__(self, dispatcher, max_workers=None):
+        self.dispatcher = dispatcher
+        self.max_workers = max_workers or min(MAX_RENDER_PROCESSES, os.cpu_count() or 1)
+        self.executor = None
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            for _ in range(self.max_workers):
+                self.executor.submit(warm_up)
+        return self.executor
+
+    def submit(self, render, *args, callback=None):
+        future = self.start().submit(render, *args)
+        return self.dispatcher.watch(future, callback)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+class ChartView(tk.Canvas):
+    # Canvas showing one chart rendered off-thread at the widget's own size.
+    # render() remembers the chart function and data, so a resize simply
+    # re-renders the same chart at the new size.
+    def __init__(self, parent, renderer, **kwargs):
+        kwargs.setdefault('highlightthickness', 0)
+        super().__init__(parent, **kwargs)
+        self.renderer = renderer
+        self.chart = None
+        self.photo = None
+        self.image_item = None
+        self.marks = ()
+        self.highlighted = None
+        self.request = 0
+        self.resize_job = None
+        self.bind('<Configure>', self.on_resize)
+
+    def render(self, render, *data):
+        self.chart = (render, data)
+        self.request_render()
+
+    def request_render(self):
+        width, height = self.winfo_width(), self.winfo_height()
+        if self.chart is None or width <= 1 or height <= 1:
+            # Not laid out yet; <Configure> will render once it has a size
+            return
+        render, data = self.chart
+        self.request += 1
+        request = self.request
+        dpi = self.winfo_fpixels('1i')
+        background = [channel >> 8 for channel in self.winfo_rgb(self.cget('background'))]
+        self.renderer.submit(
+            render_image, render, background, width, height, dpi, *data,
+            callback=lambda chart: self.show(chart, request)
+        )
+
+    def on_resize(self, event):
+        if self.photo is None:
+            # First layout: nothing on screen yet, so don't wait
+            self.request_render()
+            return
+        if self.resize_job is not None:
+            self.after_cancel(self.resize_job)
+        self.resize_job = self.after(RESIZE_DELAY_MS, self.on_resize_settled)
+
+    def on_resize_settled(self):
+        self.resize_job = None
+        self.request_render()
+
+    def show(self, chart, request):
+        if request != self.request or not self.winfo_exists():
+            # A newer render is on its way
+            return
+        self.photo = tk.PhotoImage(master=self, data=chart.ppm, format='PPM')
+        if self.image_item is None:
+            self.image_item = self.create_image(0, 0, image=self.photo, anchor=tk.NW)
+        else:
+            self.itemconfigure(self.image_item, image=self.photo)
+        self.marks = chart.marks
+        self.highlight(self.highlighted)
+
+    def highlight(self, index):
+        # Outlines one data item on top of the image; the image is untouched
+        self.highlighted = index
+        self.delete('highlight')
+        if index is not None and index < len(self.marks):
+            self.create_rectangle(
+                *self.marks[index],
+                outline=HIGHLIGHT_COLOR,
+                width=2,
+                tags='highlight'
+            )
@@ -0,0 +1,43 @@
+from datetime import date, datetime
+
+# Dates are stored twice: as ISO text for display, and as a day number
+# (date.toordinal()) that the indexes sort and range-scan on. Day 0 means
+# "no date" and sorts before every real date.
+NO_DAY = 0
+ISO_FORMAT = '%Y-%m-%d'
+
+# Text written by older versions: DateEntry's MM/DD/YY, and the timestamp
+# routines record when they are completed
+LEGACY_FORMATS = ('%m/%d/%y', '%Y-%m-%d %H:%M:%S')
+
+
+def parse_date(text):
+    for date_format in (ISO_FORMAT,) + LEGACY_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def to_day(value):
+    # Accepts a date, a datetime, stored text or None
+    if isinstance(value, str):
+        value = parse_date(value.strip())
+    if value is None:
+        return NO_DAY
+    return value.toordinal()
+
+
+def from_day(day):
+    return date.fromordinal(day) if day else None
+
+
+def format_day(day):
+    return date.fromordinal(day).strftime(ISO_FORMAT) if day else ''
+
+
+def register_functions(conn):
+    # Lets SQL statements convert stored text, e.g. in migrations
+    conn.create_function('to_day', 1, to_day, deterministic=True)
+    conn.create_function('format_day', 1, format_day, deterministic=True)
@@ -0,0 +1,99 @@
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+
+POLL_INTERVAL_MS = 10
+
+
+class UiDispatcher:
+    # Hands results from worker threads back to the Tk thread. Workers only
+    # put finished futures on a queue; the queue is drained by root.after
+    # polling, which runs only while something is outstanding, so callbacks
+    # always run on the Tk thread and an idle app doesn't wake up.
+    def __init__(self, root, poll_interval=POLL_INTERVAL_MS):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.completed = queue.SimpleQueue()
+        self.pending = 0
+        self.after_id = None
+
+    def watch(self, future, callback=None, errback=None):
+        self.pending += 1
+        future.add_done_callback(lambda f: self.completed.put((f, callback, errback)))
+        if self.after_id is None:
+            self.after_id = self.root.after(self.poll_interval, self.poll)
+        return future
+
+    def poll(self):
+        while True:
+            try:
+                future, callback, errback = self.completed.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            self.deliver(future, callback, errback)
+
+        if self.pending:
+            self.after_id = self.root.after(self.poll_interval, self.poll)
+        else:
+            self.after_id = None
+
+    def deliver(self, future, callback, errback):
+        try:
+            if future.cancelled():
+                return
+            exc = future.exception()
+            if exc is None:
+                if callback:
+                    callback(future.result())
+            elif errback:
+                errback(exc)
+            else:
+                raise exc
+        except Exception:
+            # Same reporting as an exception raised in any other Tk callback
+            self.root.report_callback_exception(*sys.exc_info())
+
+
+class DatabaseWorker:
+    # Owns the repository on a dedicated thread. Views submit repository
+    # method names with arguments and get the result back on the Tk thread,
+    # so no query or commit ever runs inside a Tk event handler. Requests run
+    # one at a time in submission order, which keeps writes and the reads
+    # that follow them consistent.
+    def __init__(self, repo, dispatcher):
+        self.repo = repo
+        self.dispatcher = dispatcher
+        self.requests = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, name="database", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            future, method, args = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = getattr(self.repo, method)(*args)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+        self.repo.close()
+
+    def submit(self, method, *args, callback=None, errback=None):
+        future = Future()
+        self.requests.put((future, method, args))
+        return self.dispatcher.watch(future, callback, errback)
+
+    def data_version(self, tables):
+        return self.repo.data_version(tables)
+
+    def close(self):
+        # Finishes the requests already queued, then closes the connection
+        self.requests.put(None)
+        self.thread.join()
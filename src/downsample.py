@@ -0,0 +1,65 @@
+# Time series are cut down to about one point per horizontal pixel before
+# they are plotted, so drawing costs the same for a month as for ten years.
+# Largest-Triangle-Three-Buckets keeps the points that shape the line
+# (peaks, dips, steps), which plain striding would skip.
+
+# Below this many points per pixel the series is plotted as it is
+MIN_POINTS_PER_PIXEL = 2
+
+
+def finite(x, y):
+    # The points of a series that have a value; NaN marks days without one
+    import numpy as np
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(y)
+    return x[keep], y[keep]
+
+
+def lttb(x, y, points):
+    # Picks `points` of the (x, y) samples, x ascending, always keeping the
+    # first and last. The samples in between are split into points - 2
+    # buckets, and from each the one forming the largest triangle with the
+    # point picked from the bucket before and the mean of the bucket after.
+    import numpy as np
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if points >= n or points < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    picked = np.empty(points, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    last = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        after_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        mean_x = x[end:after_end].mean()
+        mean_y = y[end:after_end].mean()
+        area = np.abs(
+            (x[last] - mean_x) * (y[start:end] - y[last])
+            - (x[last] - x[start:end]) * (mean_y - y[last])
+        )
+        last = start + int(np.argmax(area))
+        picked[bucket + 1] = last
+    return x[picked], y[picked]
+
+
+def for_width(x, y, pixels, first=None, last=None):
+    # The part of a series between x = first and last (the whole series if
+    # they are None), thinned to the pixel width it is drawn at. One point
+    # either side of the range is kept so lines run to the axes edges.
+    import numpy as np
+
+    x, y = finite(x, y)
+    if first is not None:
+        start = max(int(np.searchsorted(x, first, side='left')) - 1, 0)
+        end = int(np.searchsorted(x, last, side='right')) + 1
+        x, y = x[start:end], y[start:end]
+    pixels = max(int(pixels), 3)
+    if len(x) <= pixels * MIN_POINTS_PER_PIXEL:
+        return x, y
+    return lttb(x, y, pixels)
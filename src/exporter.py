@@ -0,0 +1,274 @@
+import csv
+import json
+import os
+import sqlite3
+from collections import namedtuple
+from migrations import VERSIONED_TABLES
+
+# Rows are read and written CHUNK_ROWS at a time, so memory use is the same
+# for a table of ten rows or ten million
+CHUNK_ROWS = 5000
+
+# Per export directory: the highest row version written for each table.
+# An incremental export only writes rows stamped after it.
+WATERMARK_FILE = 'watermarks.json'
+
+FORMATS = ('csv', 'jsonl', 'parquet', 'arrow')
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+# Used when pyarrow isn't installed for a columnar format
+FALLBACK_FORMAT = 'csv'
+
+ExportedTable = namedtuple('ExportedTable', 'table path rows watermark')
+ExportResult = namedtuple('ExportResult', 'format tables')
+
+
+# Writers take the column names and SQLite declared types, then chunks of
+# row tuples
+
+class CsvWriter:
+    extension = 'csv'
+
+    def __init__(self, path, columns, types):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlWriter:
+    extension = 'jsonl'
+
+    def __init__(self, path, columns, types):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.columns = columns
+
+    def write(self, rows):
+        self.file.writelines(
+            json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+    def close(self):
+        self.file.close()
+
+
+def arrow_type(pa, declared):
+    # The Arrow type for a column, from the type affinity SQLite gives its
+    # declared type. Databases upgraded from the old schema still have
+    # columns like tasks.completed BOOLEAN, which hold integers.
+    declared = declared.upper()
+    if 'INT' in declared:
+        return pa.int64()
+    if any(name in declared for name in ('CHAR', 'CLOB', 'TEXT')):
+        return pa.string()
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB')):
+        return pa.float64()
+    if 'BOOL' in declared or 'NUM' in declared:
+        return pa.int64()
+    # Untyped columns, and ones like DATE that are stored as text
+    return pa.string()
+
+
+class ArrowWriter:
+    # Parquet or Arrow IPC, one record batch per chunk. Column types come
+    # from the declared SQLite types so every batch has the same schema.
+    def __init__(self, path, columns, types, parquet):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.schema = pa.schema([
+            (name, arrow_type(pa, declared))
+            for name, declared in zip(columns, types)
+        ])
+        self.sink = None
+        if parquet:
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.sink = pa.OSFile(path, 'wb')
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def batch(self, rows):
+        pa = self.pa
+        arrays = []
+        for values, field in zip(zip(*rows), self.schema):
+            if field.type == pa.string():
+                # SQLite lets any column hold any type
+                values = [value if value is None or isinstance(value, str) else str(value)
+                          for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        return pa.record_batch(arrays, schema=self.schema)
+
+    def write(self, rows):
+        self.writer.write_table(self.pa.Table.from_batches([self.batch(rows)]))
+
+    def close(self):
+        self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+
+
+class ParquetWriter(ArrowWriter):
+    extension = 'parquet'
+
+    def __init__(self, path, columns, types):
+        super().__init__(path, columns, types, parquet=True)
+
+
+class ArrowIpcWriter(ArrowWriter):
+    extension = 'arrow'
+
+    def __init__(self, path, columns, types):
+        super().__init__(path, columns, types, parquet=False)
+
+    def write(self, rows):
+        # The IPC writer takes batches directly
+        self.writer.write_batch(self.batch(rows))
+
+
+WRITERS = {
+    'csv': CsvWriter,
+    'jsonl': JsonlWriter,
+    'parquet': ParquetWriter,
+    'arrow': ArrowIpcWriter,
+}
+
+
+def resolve_format(export_format):
+    if export_format not in FORMATS:
+        raise ValueError(f"Unknown export format {export_format!r}; expected one of {', '.join(FORMATS)}")
+    if export_format in COLUMNAR_FORMATS:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return FALLBACK_FORMAT
+    return export_format
+
+
+# The pipeline: chunks of rows come off a cursor, pass through a stage that
+# notes the highest version seen, and go to a writer
+
+def chunks(cursor):
+    while True:
+        rows = cursor.fetchmany(CHUNK_ROWS)
+        if not rows:
+            return
+        yield rows
+
+
+def track_versions(row_chunks, version_index, seen):
+    # seen is a one-item list holding the highest version so far
+    for rows in row_chunks:
+        seen[0] = max(seen[0], max(row[version_index] for row in rows))
+        yield rows
+
+
+def export_table(conn, table, directory, writer_class, since=0):
+    # Writes the table's rows with a version above since; returns an
+    # ExportedTable, whose path is None if nothing had changed
+    columns = conn.execute(f'PRAGMA table_info({table})').fetchall()
+    names = [column[1] for column in columns]
+    types = [column[2] for column in columns]
+    cursor = conn.execute(f'SELECT * FROM {table} WHERE version > ?', (since,))
+
+    seen = [since]
+    rows = 0
+    path = None
+    writer = None
+    try:
+        for chunk in track_versions(chunks(cursor), names.index('version'), seen):
+            if writer is None:
+                # Written under a temporary name and renamed once complete
+                name = table if not since else f'{table}.since-{since}'
+                path = os.path.join(directory, f'{name}.{writer_class.extension}')
+                writer = writer_class(path + '.part', names, types)
+            writer.write(chunk)
+            rows += len(chunk)
+        if writer is not None:
+            writer.close()
+            os.replace(path + '.part', path)
+    except BaseException:
+        # No partial file is left behind to be taken for an export
+        if path is not None:
+            try:
+                if writer is not None:
+                    writer.close()
+            finally:
+                if os.path.exists(path + '.part'):
+                    os.remove(path + '.part')
+        raise
+    return ExportedTable(table, path, rows, seen[0])
+
+
+def read_watermarks(directory):
+    try:
+        with open(os.path.join(directory, WATERMARK_FILE), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def write_watermarks(directory, watermarks):
+    path = os.path.join(directory, WATERMARK_FILE)
+    with open(path + '.part', 'w', encoding='utf-8') as file:
+        json.dump(watermarks, file, indent=2)
+    os.replace(path + '.part', path)
+
+
+def export_database(path, directory, export_format='csv', incremental=False, tables=None):
+    # Exports the user data tables (derived ones like task_stats are rebuilt
+    # from them) into a directory, one file per table. Incremental exports
+    # only write rows inserted or updated since the last export to the same
+    # directory; rows deleted since aren't recorded anywhere, so they can't
+    # be exported.
+    export_format = resolve_format(export_format)
+    writer_class = WRITERS[export_format]
+    tables = tables or list(VERSIONED_TABLES)
+    os.makedirs(directory, exist_ok=True)
+    watermarks = read_watermarks(directory) if incremental else {}
+
+    # A read-only connection of its own, with every table read inside one
+    # transaction so the files agree with each other even while the app
+    # keeps writing
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        conn.execute('BEGIN')
+        exported = [
+            export_table(conn, table, directory, writer_class, watermarks.get(table, 0))
+            for table in tables
+        ]
+        conn.rollback()
+    finally:
+        conn.close()
+
+    watermarks.update({table.table: table.watermark for table in exported})
+    write_watermarks(directory, watermarks)
+    return ExportResult(export_format, exported)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from repository import DATABASE_PATH
+
+    parser = argparse.ArgumentParser(description="Export the database to files, one per table.")
+    parser.add_argument('directory')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--incremental', action='store_true',
+                        help="only rows changed since the last export to this directory")
+    parser.add_argument('--database', default=DATABASE_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = export_database(args.database, args.directory, args.format, args.incremental)
+    elapsed = time.perf_counter() - started
+    if result.format != args.format:
+        print(f"pyarrow is not installed; exported {result.format} instead of {args.format}")
+    for table in result.tables:
+        print(f"{table.table}: {table.rows} rows" + (f" -> {table.path}" if table.path else ""))
+    print(f"done in {elapsed:.1f}s")
@@ -0,0 +1,65 @@
+from bisect import bisect_left
+from date_codec import from_day
+
+
+class StoredGoal:
+    # One goal row with its target date as a date (None if it has none)
+    __slots__ = ('id', 'title', 'description', 'target_date', 'target_day', 'target', 'progress')
+
+    def __init__(self, goal):
+        self.id = goal.id
+        self.title = goal.title
+        self.description = goal.description
+        self.target_date = goal.target_date
+        self.target_day = goal.target_day
+        self.target = from_day(goal.target_day)
+        self.progress = goal.progress
+
+
+class GoalStore:
+    # The goal tracker's copy of the goals table, keyed by id and kept in
+    # list order. It is loaded once and then patched row by row after each
+    # write, so dialogs and charts never go back to the database for a goal
+    # that is already on screen. version is the repository data version the
+    # contents correspond to.
+    __slots__ = ('goals', 'order', 'version')
+
+    def __init__(self):
+        self.goals = {}
+        self.order = []
+        self.version = None
+
+    @staticmethod
+    def sort_key(goal):
+        # Mirrors ORDER BY target_day, with id to keep ties stable
+        return (goal.target_day, goal.id)
+
+    def load(self, goals, version):
+        self.goals = {goal.id: StoredGoal(goal) for goal in goals}
+        self.order = sorted(self.sort_key(goal) for goal in self.goals.values())
+        self.version = version
+
+    def put(self, goal, version):
+        # Adds or replaces a goal; returns its new position in the list
+        self.remove(goal.id, version)
+        stored = StoredGoal(goal)
+        key = self.sort_key(stored)
+        index = bisect_left(self.order, key)
+        self.order.insert(index, key)
+        self.goals[stored.id] = stored
+        return index
+
+    def remove(self, goal_id, version):
+        self.version = version
+        goal = self.goals.pop(goal_id, None)
+        if goal is not None:
+            del self.order[bisect_left(self.order, self.sort_key(goal))]
+
+    def get(self, goal_id):
+        return self.goals.get(goal_id)
+
+    def __iter__(self):
+        return (self.goals[goal_id] for _, goal_id in self.order)
+
+    def __len__(self):
+        return len(self.order)
@@ -2,21 +2,25 @@ import tkinter as tk
 from tkinter import ttk
 import customtkinter as ctk
 from tkcalendar import DateEntry
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
-from datetime import datetime
-import seaborn as sns
+from chart_renderer import ChartView, render_goal_progress, render_goal_timeline
+from goal_store import GoalStore
+from date_codec import to_day
+
+# Selection only moves the chart highlight, and is applied once the user
+# stops clicking or arrowing through the list
+SELECT_DELAY_MS = 80
 
 class GoalTracker:
-    def __init__(self, parent, conn):
+    tables = ('goals',)
+
+    def __init__(self, parent, db, charts):
         self.parent = parent
-        self.conn = conn
-        self.cursor = conn.cursor()
-        self.date_format = '%Y-%m-%d'
+        self.db = db
+        self.charts = charts
+        self.store = GoalStore()
+        self.charts_version = None
+        self.select_job = None
         
-        # Set up the style for matplotlib
-        plt.style.use('dark_background')
         self.setup_ui()
         self.load_goals()
 
@@ -75,7 +79,7 @@ class GoalTracker:
         self.goal_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.goal_tree.bind('<<TreeviewSelect>>', self.update_visualizations)
+        self.goal_tree.bind('<<TreeviewSelect>>', self.on_select)
 
         # Right frame for visualizations
         right_frame = ctk.CTkFrame(self.split_container)
@@ -90,17 +94,15 @@ class GoalTracker:
         self.viz_notebook.add(self.progress_frame, text='Progress')
 
         # Create modern progress chart
-        self.fig_progress, self.ax_progress = plt.subplots(figsize=(8, 6))
-        self.canvas_progress = FigureCanvasTkAgg(self.fig_progress, master=self.progress_frame)
-        self.canvas_progress.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.progress_chart = ChartView(self.progress_frame, self.charts, background='black')
+        self.progress_chart.pack(fill=tk.BOTH, expand=True)
 
         # Timeline Chart Tab
         self.timeline_frame = ctk.CTkFrame(self.viz_notebook)
         self.viz_notebook.add(self.timeline_frame, text='Timeline')
 
-        self.fig_timeline, self.ax_timeline = plt.subplots(figsize=(8, 6))
-        self.canvas_timeline = FigureCanvasTkAgg(self.fig_timeline, master=self.timeline_frame)
-        self.canvas_timeline.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.timeline_chart = ChartView(self.timeline_frame, self.charts, background='black')
+        self.timeline_chart.pack(fill=tk.BOTH, expand=True)
 
         # Add right-click menu binding
         self.goal_tree.bind("<Button-3>", self.show_context_menu)
@@ -111,6 +113,9 @@ class GoalTracker:
         self.context_menu.add_command(label="Edit Goal", command=self.show_edit_goal_dialog)
         self.context_menu.add_command(label="Delete Goal", command=self.delete_goal)
         
+    def refresh(self):
+        self.load_goals()
+
     def show_add_goal_dialog(self):
         dialog = ctk.CTkToplevel(self.parent)
         dialog.title("Add New Goal")
@@ -173,21 +178,14 @@ class GoalTracker:
                 tk.messagebox.showwarning("Input Required", "Please enter a goal title")
                 return
                 
-            # Format the date properly before saving
-            selected_date = datetime.strptime(target_date.get(), '%m/%d/%y')
-            formatted_date = selected_date.strftime(self.date_format)
-                
-            self.cursor.execute('''
-                INSERT INTO goals (title, description, target_date, progress)
-                VALUES (?, ?, ?, ?)
-            ''', (
+            self.db.submit(
+                'add_goal',
                 title_entry.get(),
                 desc_text.get("1.0", tk.END),
-                formatted_date,
-                float(progress_var.get())
-            ))
-            self.conn.commit()
-            self.load_goals()
+                to_day(target_date.get_date()),
+                float(progress_var.get()),
+                callback=self.reload_goal
+            )
             dialog.destroy()
 
         def cancel():
@@ -226,20 +224,6 @@ class GoalTracker:
         dialog.bind('<Return>', lambda e: save_goal())
         dialog.bind('<Escape>', lambda e: cancel())
 
-    def load_goals(self):
-        for item in self.goal_tree.get_children():
-            self.goal_tree.delete(item)
-
-        self.cursor.execute('SELECT * FROM goals ORDER BY target_date')
-        for goal in self.cursor.fetchall():
-            self.goal_tree.insert('', tk.END, values=(
-                goal[1],  # title
-                goal[3],  # target_date
-                f"{goal[4]}%"  # progress
-            ))
-        
-        self.update_visualizations()
-    
     def show_context_menu(self, event):
         item = self.goal_tree.identify_row(event.y)
         if item:
@@ -247,80 +231,52 @@ class GoalTracker:
             self.context_menu.post(event.x_root, event.y_root)
 
 
-    def update_visualizations(self, event=None):
-        # Clear previous plots
-        self.ax_progress.clear()
-        self.ax_timeline.clear()
+    def update_visualizations(self):
+        # The charts only depend on the goals table, so they are rendered
+        # again only when a write has changed it since the last render
+        if self.charts_version == self.store.version:
+            return
+        self.charts_version = self.store.version
 
-        # Get all goals data
-        self.cursor.execute('SELECT title, progress, target_date FROM goals ORDER BY target_date')
-        goals_data = self.cursor.fetchall()
+        # The charts are laid out and rendered by the chart processes
+        goals = list(self.store)
+        titles = [goal.title for goal in goals]
 
-        if goals_data:
-            titles = [goal[0] for goal in goals_data]
-            progress = [goal[1] for goal in goals_data]
-            
-            # Handle different date formats
-            target_dates = []
-            for goal in goals_data:
-                try:
-                    # Try parsing as YYYY-MM-DD first
-                    date = datetime.strptime(goal[2], self.date_format)
-                except ValueError:
-                    try:
-                        # Try parsing as MM/DD/YY
-                        date = datetime.strptime(goal[2], '%m/%d/%y')
-                    except ValueError:
-                        # If both fail, use today's date as fallback
-                        date = datetime.now()
-                target_dates.append(date)
-
-            # Rest of the visualization code remains the same
-            colors = plt.cm.viridis(np.linspace(0, 1, len(titles)))
-            
-            # Progress Chart
-            bars = self.ax_progress.barh(titles, progress, color=colors)
-            for bar in bars:
-                width = bar.get_width()
-                self.ax_progress.text(
-                    width, 
-                    bar.get_y() + bar.get_height()/2,
-                    f'{int(width)}%',
-                    va='center',
-                    ha='left' if width < 50 else 'right',
-                    color='white'
-                )
-
-            self.ax_progress.set_xlabel('Progress (%)')
-            self.ax_progress.set_title('Goal Progress Overview')
-            self.ax_progress.grid(True, alpha=0.3)
-            
-            # Timeline Chart
-            y_positions = range(len(titles))
-            self.ax_timeline.scatter(target_dates, y_positions, c=colors, s=100)
-            self.ax_timeline.set_yticks(y_positions)
-            self.ax_timeline.set_yticklabels(titles)
-            self.ax_timeline.set_xlabel('Target Date')
-            self.ax_timeline.set_title('Goal Timeline')
-            self.ax_timeline.grid(True, alpha=0.3)
-
-            # Rotate date labels for better readability
-            plt.setp(self.ax_timeline.get_xticklabels(), rotation=45, ha='right')
-
-        # Adjust layout and display
-        self.fig_progress.tight_layout()
-        self.fig_timeline.tight_layout()
-        self.canvas_progress.draw()
-        self.canvas_timeline.draw()
+        self.progress_chart.render(
+            render_goal_progress,
+            titles,
+            [goal.progress for goal in goals]
+        )
+        self.timeline_chart.render(
+            render_goal_timeline,
+            titles,
+            [goal.target for goal in goals]
+        )
+
+    def on_select(self, event=None):
+        if self.select_job is not None:
+            self.goal_tree.after_cancel(self.select_job)
+        self.select_job = self.goal_tree.after(SELECT_DELAY_MS, self.highlight_selection)
+
+    def highlight_selection(self):
+        self.select_job = None
+        selected_item = self.goal_tree.selection()
+        # Tree rows are in the same order as the chart bars and points
+        index = self.goal_tree.index(selected_item[0]) if selected_item else None
+        self.progress_chart.highlight(index)
+        self.timeline_chart.highlight(index)
     
     
     def show_update_progress_dialog(self):
-        selected_item = self.goal_tree.selection()
-        if not selected_item:
+        goal = self.selected_goal()
+        if goal is None:
             return
             
-        goal_id = self.get_selected_goal_id()
-        current_progress = self.get_goal_progress(goal_id)
+        self.open_update_progress_dialog(goal)
+
+    def open_update_progress_dialog(self, goal):
+        goal_id = goal.id
+        current_progress = goal.progress
         
         dialog = ctk.CTkToplevel(self.parent)
         dialog.title("Update Progress")
@@ -361,13 +317,8 @@ class GoalTracker:
         progress_var.trace_add("write", update_progress_label)
         
         def save_progress():
-            self.cursor.execute('''
-                UPDATE goals 
-                SET progress = ?
-                WHERE id = ?
-            ''', (float(progress_var.get()), goal_id))
-            self.conn.commit()
-            self.load_goals()
+            self.db.submit('set_goal_progress', goal_id, float(progress_var.get()),
+                           callback=lambda _: self.reload_goal(goal_id))
             dialog.destroy()
         
         button_frame = ctk.CTkFrame(content, fg_color="transparent")
@@ -382,12 +333,14 @@ class GoalTracker:
         ).pack(expand=True)
 
     def show_edit_goal_dialog(self):
-        selected_item = self.goal_tree.selection()
-        if not selected_item:
+        goal = self.selected_goal()
+        if goal is None:
             return
             
-        goal_id = self.get_selected_goal_id()
-        goal_data = self.get_goal_data(goal_id)
+        self.open_edit_goal_dialog(goal)
+
+    def open_edit_goal_dialog(self, goal):
+        goal_id = goal.id
         
         dialog = ctk.CTkToplevel(self.parent)
         dialog.title("Edit Goal")
@@ -403,13 +356,13 @@ class GoalTracker:
         # Title
         ctk.CTkLabel(content, text="Goal Title:", font=('Helvetica', 12, 'bold')).pack(pady=(0, 5))
         title_entry = ctk.CTkEntry(content, width=300)
-        title_entry.insert(0, goal_data['title'])
+        title_entry.insert(0, goal.title)
         title_entry.pack(pady=(0, 15))
         
         # Description
         ctk.CTkLabel(content, text="Description:", font=('Helvetica', 12, 'bold')).pack(pady=(0, 5))
         desc_text = ctk.CTkTextbox(content, height=100)
-        desc_text.insert("1.0", goal_data['description'])
+        desc_text.insert("1.0", goal.description)
         desc_text.pack(fill=tk.X, pady=(0, 15))
         
         # Target Date
@@ -417,26 +370,19 @@ class GoalTracker:
         date_frame = ctk.CTkFrame(content)
         date_frame.pack(fill=tk.X, pady=(0, 15))
         target_date = DateEntry(date_frame, width=30, background='darkblue', foreground='white')
-        target_date.set_date(datetime.strptime(goal_data['target_date'], '%Y-%m-%d'))
+        if goal.target is not None:
+            target_date.set_date(goal.target)
         target_date.pack()
         
         def save_changes():
-            # Format the date properly before saving
-            selected_date = datetime.strptime(target_date.get(), '%m/%d/%y')
-            formatted_date = selected_date.strftime(self.date_format)
-            
-            self.cursor.execute('''
-                UPDATE goals 
-                SET title = ?, description = ?, target_date = ?
-                WHERE id = ?
-            ''', (
+            self.db.submit(
+                'update_goal',
+                goal_id,
                 title_entry.get(),
                 desc_text.get("1.0", tk.END),
-                formatted_date,
-                goal_id
-            ))
-            self.conn.commit()
-            self.load_goals()
+                to_day(target_date.get_date()),
+                callback=lambda _: self.reload_goal(goal_id)
+            )
             dialog.destroy()
         
         button_frame = ctk.CTkFrame(content, fg_color="transparent")
@@ -452,47 +398,58 @@ class GoalTracker:
         ).pack(expand=True)
 
     def delete_goal(self):
-        selected_item = self.goal_tree.selection()
-        if not selected_item:
+        goal = self.selected_goal()
+        if goal is None:
             return
             
-        goal_id = self.get_selected_goal_id()
         if tk.messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this goal?"):
-            self.cursor.execute('DELETE FROM goals WHERE id = ?', (goal_id,))
-            self.conn.commit()
-            self.load_goals()
-
-    def get_selected_goal_id(self):
-        selected_item = self.goal_tree.selection()[0]
-        self.cursor.execute('SELECT id FROM goals WHERE title = ?', 
-                        (self.goal_tree.item(selected_item)['values'][0],))
-        return self.cursor.fetchone()[0]
-
-    def get_goal_data(self, goal_id):
-        self.cursor.execute('SELECT * FROM goals WHERE id = ?', (goal_id,))
-        goal = self.cursor.fetchone()
-        return {
-            'title': goal[1],
-            'description': goal[2],
-            'target_date': goal[3],
-            'progress': goal[4]
-        }
-
-    def get_goal_progress(self, goal_id):
-        self.cursor.execute('SELECT progress FROM goals WHERE id = ?', (goal_id,))
-        return self.cursor.fetchone()[0]
+            self.db.submit('delete_goal', goal.id, callback=lambda _: self.reload_goal(goal.id))
+
+    def selected_goal(self):
+        # Tree rows use the goal id as their iid
+        selected_item = self.goal_tree.selection()
+        if not selected_item:
+            return None
+        return self.store.get(int(selected_item[0]))
 
     def load_goals(self):
+        # Taken before the read is queued, so it is never newer than the rows
+        version = self.db.data_version(self.tables)
+        self.db.submit('all_goals', callback=lambda goals: self.show_goals(goals, version))
+
+    def show_goals(self, goals, version):
+        self.store.load(goals, version)
+
         # Clear existing items
-        for item in self.goal_tree.get_children():
-            self.goal_tree.delete(item)
-        
-        self.cursor.execute('SELECT * FROM goals ORDER BY target_date')
-        for goal in self.cursor.fetchall():
-            self.goal_tree.insert('', tk.END, values=(
-                goal[1],  # title
-                goal[3],  # target_date
-                f"{goal[4]}%"  # progress
-            ))
-        
-        self.update_visualizations()
\ No newline at end of file
+        self.goal_tree.delete(*self.goal_tree.get_children())
+        
+        for goal in self.store:
+            self.goal_tree.insert('', tk.END, iid=str(goal.id), values=self.row_values(goal))
+        
+        self.update_visualizations()
+        # The rebuilt list has no selection
+        self.highlight_selection()
+
+    def row_values(self, goal):
+        return (goal.title, goal.target_date, f"{goal.progress}%")
+
+    def reload_goal(self, goal_id):
+        # Re-reads just the goal that was written and patches it into the
+        # store and the list; a goal that is gone is removed from both
+        version = self.db.data_version(self.tables)
+        self.db.submit('goal', goal_id, callback=lambda goal: self.show_goal(goal_id, goal, version))
+
+    def show_goal(self, goal_id, goal, version):
+        iid = str(goal_id)
+        selected = iid in self.goal_tree.selection()
+        if self.goal_tree.exists(iid):
+            self.goal_tree.delete(iid)
+        if goal is None:
+            self.store.remove(goal_id, version)
+        else:
+            index = self.store.put(goal, version)
+            self.goal_tree.insert('', index, iid=iid, values=self.row_values(self.store.get(goal_id)))
+            if selected:
+                self.goal_tree.selection_set(iid)
+        self.update_visualizations()
+        self.highlight_selection()
\ No newline at end of file
@@ -0,0 +1,359 @@
+import csv
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+from date_codec import ISO_FORMAT, parse_date
+from recurrence import DAILY, WEEKLY, MONTHLY, days_to_mask
+
+# Rows are normalised and inserted BATCH_SIZE at a time, all in one
+# transaction. Once an import has inserted DEFER_AFTER_ROWS rows, the
+# table's indexes and triggers are dropped and only rebuilt at the end,
+# which beats updating them row by row; smaller imports keep them.
+BATCH_SIZE = 5000
+DEFER_AFTER_ROWS = 20000
+
+# Invalid rows are skipped; this many of their errors are kept for the report
+MAX_ERRORS = 100
+
+ImportProgress = namedtuple('ImportProgress', 'records imported skipped bytes_read total_bytes')
+ImportResult = namedtuple('ImportResult', 'imported skipped errors')
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+# Field normalisers. Each takes the raw value from the file (text from CSV,
+# any JSON value from JSONL) and returns what is stored, or raises InvalidRow.
+
+def text(value):
+    if value is None:
+        return ''
+    return value.strip() if isinstance(value, str) else str(value)
+
+
+def required(value, name):
+    value = text(value)
+    if not value:
+        raise InvalidRow(f"{name} is missing")
+    return value
+
+
+@lru_cache(maxsize=8192)
+def parse_day(value):
+    # Day number and ISO text; the same dates come up again and again in
+    # a history, so each is only parsed once
+    try:
+        # Most files already use ISO dates, and fromisoformat is far faster
+        parsed = date.fromisoformat(value)
+    except ValueError:
+        parsed = parse_date(value)
+    if parsed is None:
+        raise InvalidRow(f"unrecognised date {value!r}")
+    return parsed.toordinal(), parsed.strftime(ISO_FORMAT)
+
+
+def day(value, name, optional=True):
+    # An empty value is no date
+    value = text(value)
+    if not value:
+        if optional:
+            return 0, ''
+        raise InvalidRow(f"{name} is missing")
+    return parse_day(value)
+
+
+def choice(value, choices, name, default=''):
+    # One of a fixed set of names, whatever the case in the file
+    value = text(value)
+    if not value:
+        return default
+    canonical = choices.get(value) or choices.get(value.casefold())
+    if canonical is None:
+        raise InvalidRow(f"unknown {name} {value!r}")
+    return canonical
+
+
+@lru_cache(maxsize=1024)
+def category(value):
+    # Categories are free text; known ones are matched whatever their case
+    # and the rest title-cased, so 'work' and 'WORK' land together
+    return CATEGORIES.get(value.casefold(), value.title())
+
+
+def number(value, name, low, high, convert=float):
+    try:
+        value = convert(value)
+    except (TypeError, ValueError):
+        raise InvalidRow(f"{name} {value!r} is not a number") from None
+    if not low <= value <= high:
+        raise InvalidRow(f"{name} {value} is outside {low}-{high}")
+    return value
+
+
+def time_of_day(value):
+    value = text(value)
+    try:
+        return datetime.strptime(value, '%H:%M').strftime('%H:%M')
+    except ValueError:
+        raise InvalidRow(f"time {value!r} is not HH:MM") from None
+
+
+def names(values):
+    # Looked up as written first, then case-folded
+    return {key: value for value in values for key in (value, value.casefold())}
+
+
+CATEGORIES = names(['Work', 'Personal', 'Study'])
+PRIORITIES = names(['High', 'Medium', 'Low'])
+STATUSES = names(['pending', 'completed', 'abandoned'])
+FREQUENCIES = names([DAILY, WEEKLY, MONTHLY])
+
+
+# Row builders: one record (a dict keyed by column name) in, the values for
+# the table's INSERT out
+
+def task_row(record):
+    due_day, due_date = day(record.get('due_date'), 'due_date')
+    return (
+        required(record.get('title'), 'title'),
+        text(record.get('description')),
+        category(text(record.get('category'))),
+        choice(record.get('priority'), PRIORITIES, 'priority'),
+        due_date,
+        due_day,
+        choice(record.get('status'), STATUSES, 'status', 'pending'),
+    )
+
+
+def goal_row(record):
+    target_day, target_date = day(record.get('target_date'), 'target_date')
+    progress = record.get('progress')
+    return (
+        required(record.get('title'), 'title'),
+        text(record.get('description')),
+        target_date,
+        target_day,
+        number(progress, 'progress', 0, 100) if text(progress) else 0,
+    )
+
+
+def routine_row(record):
+    day_mask = record.get('day_mask')
+    if text(day_mask):
+        day_mask = number(day_mask, 'day_mask', 0, 127, int)
+    else:
+        # Weekday names as older versions stored them, e.g. "Mon,Wed"
+        day_mask = days_to_mask(text(record.get('days')))
+    start_day, _ = day(record.get('start_date'), 'start_date')
+    return (
+        required(record.get('title'), 'title'),
+        choice(record.get('frequency'), FREQUENCIES, 'frequency', DAILY),
+        time_of_day(record.get('time')),
+        day_mask,
+        text(record.get('color')),
+        start_day or date.today().toordinal(),
+    )
+
+
+def recovery_row(record):
+    log_day, log_date = day(record.get('date'), 'date', optional=False)
+    return (
+        log_date,
+        log_day,
+        number(record.get('energy_level'), 'energy_level', 1, 10, int),
+        number(record.get('sleep_hours'), 'sleep_hours', 0, 24),
+        text(record.get('physical_activity')),
+        text(record.get('recovery_activity')),
+        text(record.get('notes')),
+    )
+
+
+# What each importable table takes: the INSERT columns, the row builder
+# and statements that rebuild data the table's triggers keep when those
+# were dropped for the import
+ImportTable = namedtuple('ImportTable', 'columns build_row rebuild')
+
+TABLES = {
+    'tasks': ImportTable(
+        ('title', 'description', 'category', 'priority', 'due_date', 'due_day', 'status'),
+        task_row,
+        (
+            'DELETE FROM task_stats',
+            '''
+            INSERT INTO task_stats (category, status, count)
+            SELECT IFNULL(category, ''), IFNULL(status, 'pending'), COUNT(*)
+            FROM tasks
+            GROUP BY 1, 2
+            ''',
+        )
+    ),
+    'goals': ImportTable(
+        ('title', 'description', 'target_date', 'target_day', 'progress'),
+        goal_row,
+        ()
+    ),
+    'routines': ImportTable(
+        ('title', 'frequency', 'time', 'day_mask', 'color', 'start_day'),
+        routine_row,
+        ()
+    ),
+    'recovery_logs': ImportTable(
+        ('date', 'day', 'energy_level', 'sleep_hours',
+         'physical_activity', 'recovery_activity', 'notes'),
+        recovery_row,
+        ()
+    ),
+}
+
+
+# Readers yield one dict per record, lazily, so files of any size stream
+# through in constant memory
+
+def read_csv(file):
+    reader = csv.reader(file)
+    header = [name.strip().lower() for name in next(reader, [])]
+    for row in reader:
+        yield dict(zip(header, row))
+
+
+def read_jsonl(file):
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield InvalidRow(f"invalid JSON: {exc}")
+            continue
+        yield record if isinstance(record, dict) else InvalidRow("not a JSON object")
+
+
+READERS = {
+    '.csv': read_csv,
+    '.jsonl': read_jsonl,
+    '.ndjson': read_jsonl,
+}
+
+
+def defer_schema(conn, table):
+    # Drops the table's indexes and triggers, returning the SQL to recreate
+    # them. Being inside the import's transaction, a failed import gets
+    # them back on rollback.
+    objects = conn.execute('''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''', (table,)).fetchall()
+    for object_type, name, _ in objects:
+        conn.execute(f'DROP {object_type.upper()} {name}')
+    return [sql for _, _, sql in objects]
+
+
+def import_records(conn, table, records, progress=None, position=None):
+    # Inserts records into a table in one transaction. progress is called
+    # with an ImportProgress after each batch; position, if given, returns
+    # (bytes_read, total_bytes) for it.
+    spec = TABLES[table]
+    columns = spec.columns + ('version',)
+    insert = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+    count = imported = skipped = 0
+    errors = []
+    deferred = None
+
+    conn.execute('BEGIN')
+    try:
+        # The whole import is one change for incremental exports (see
+        # migrations.row_versions); rows are stamped with it as they go in,
+        # which still holds once the version triggers are dropped
+        conn.execute('UPDATE change_counter SET value = value + 1')
+        version = conn.execute('SELECT value FROM change_counter').fetchone()
+        records = iter(records)
+        while True:
+            batch = list(islice(records, BATCH_SIZE))
+            if not batch:
+                break
+            rows = []
+            for index, record in enumerate(batch, count + 1):
+                try:
+                    if isinstance(record, InvalidRow):
+                        raise record
+                    rows.append(spec.build_row(record) + version)
+                except InvalidRow as exc:
+                    skipped += 1
+                    if len(errors) < MAX_ERRORS:
+                        errors.append(f"record {index}: {exc}")
+            count += len(batch)
+
+            if deferred is None and imported + len(rows) >= DEFER_AFTER_ROWS:
+                deferred = defer_schema(conn, table)
+            conn.executemany(insert, rows)
+            imported += len(rows)
+
+            if progress:
+                bytes_read, total_bytes = position() if position else (None, None)
+                progress(ImportProgress(count, imported, skipped, bytes_read, total_bytes))
+
+        if deferred is not None:
+            for sql in deferred:
+                conn.execute(sql)
+            for sql in spec.rebuild:
+                conn.execute(sql)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return ImportResult(imported, skipped, errors)
+
+
+def import_path(conn, table, path, progress=None):
+    # CSV needs a header row with the column names; JSONL has one object
+    # per line. Either way the keys are the table's column names (plus
+    # days/start_date for routines).
+    if table not in TABLES:
+        raise ValueError(f"Can't import into {table!r}; expected one of {', '.join(TABLES)}")
+    extension = os.path.splitext(path)[1].lower()
+    reader = READERS.get(extension)
+    if reader is None:
+        raise ValueError(f"Unsupported file type {extension!r}; expected .csv or .jsonl")
+
+    total_bytes = os.path.getsize(path)
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        # The byte position of the underlying buffer; read-ahead makes it
+        # approximate, which is plenty for a progress report
+        position = lambda: (file.buffer.tell(), total_bytes)
+        return import_records(conn, table, reader(file), progress, position)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from repository import DATABASE_PATH, Repository
+
+    if len(sys.argv) < 3:
+        sys.exit(f"usage: python importer.py {{{','.join(TABLES)}}} FILE [DATABASE]")
+    table, path = sys.argv[1], sys.argv[2]
+
+    def report(progress):
+        share = progress.bytes_read / progress.total_bytes if progress.total_bytes else 1
+        print(f"\r{share:6.1%}  {progress.imported} imported, {progress.skipped} skipped",
+              end='', file=sys.stderr)
+
+    repo = Repository(sys.argv[3] if len(sys.argv) > 3 else DATABASE_PATH)
+    try:
+        started = time.perf_counter()
+        result = repo.import_file(table, path, report)
+        elapsed = time.perf_counter() - started
+    finally:
+        repo.close()
+    print(file=sys.stderr)
+    print(f"{result.imported} rows imported, {result.skipped} skipped "
+          f"in {elapsed:.1f}s ({result.imported / max(elapsed, 1e-9):,.0f} rows/s)")
+    for error in result.errors:
+        print(f"  {error}")
@@ -1,13 +1,26 @@
 import tkinter as tk
 from tkinter import ttk
-import sqlite3
-from ttkthemes import ThemedTk
-from PIL import Image, ImageTk
+from repository import Repository
+from db_worker import DatabaseWorker, UiDispatcher
+from chart_renderer import ChartRenderer
+from reminders import ReminderScheduler
+from view_cache import ViewCache
+from prewarm import prewarm
 import sv_ttk
 
+# Number of sections kept alive after they have been visited. Lower it on
+# memory-constrained machines; None keeps every section.
+VIEW_CACHE_SIZE = None
+
+# Delay after the first paint before the section dependencies are imported
+# in the background (see prewarm.py)
+PREWARM_DELAY_MS = 50
+
 class ModernApp:
-    def __init__(self):
-        self.root = ThemedTk(theme="arc")
+    def __init__(self, prewarm_imports=True):
+        # Plain Tk root: sv_ttk replaces the ttk theme straight away, so
+        # loading ttkthemes' own theme first only cost startup time
+        self.root = tk.Tk()
         self.root.title("Personal Management Tool")
         self.root.geometry("1200x800")
         
@@ -24,6 +37,9 @@ class ModernApp:
         self.create_main_content()
         self.init_database()
 
+        if prewarm_imports:
+            self.schedule_prewarm()
+
     def setup_styles(self):
         style = ttk.Style()
         
@@ -110,12 +126,12 @@ class ModernApp:
         self.main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
 
         # Welcome message
-        welcome_frame = ttk.Frame(self.main_frame)
-        welcome_frame.pack(pady=20, padx=20, fill=tk.BOTH, expand=True)
+        self.welcome_frame = ttk.Frame(self.main_frame)
+        self.welcome_frame.pack(pady=20, padx=20, fill=tk.BOTH, expand=True)
 
         # Welcome header
         welcome_header = ttk.Label(
-            welcome_frame,
+            self.welcome_frame,
             text="Welcome to Personal Management Tool",
             font=('Helvetica', 24),
             wraplength=800
@@ -124,7 +140,7 @@ class ModernApp:
 
         # Welcome description
         welcome_desc = ttk.Label(
-            welcome_frame,
+            self.welcome_frame,
             text="Track your tasks, goals, routines, and recovery all in one place.",
             font=('Helvetica', 12),
             wraplength=600
@@ -137,106 +153,55 @@ class ModernApp:
         else:
             sv_ttk.set_theme("light")
 
-    def init_database(self):
-        self.conn = sqlite3.connect('personal_management.db')
-        self.cursor = self.conn.cursor()
-        self.create_tables()
+    def schedule_prewarm(self):
+        # after_idle runs once the pending first paint has been processed
+        self.root.after_idle(lambda: self.root.after(PREWARM_DELAY_MS, self.prewarm))
 
+    def prewarm(self):
+        prewarm()
+        # Spawning the render processes also imports matplotlib in each.
+        # Without prewarming they are spawned for the first chart instead.
+        self.charts.start()
 
-    def create_tables(self):
-        
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                description TEXT,
-                category TEXT,
-                priority TEXT,
-                due_date TEXT,
-                completed BOOLEAN DEFAULT 0
-            )
-        ''')
-        # First, create a backup of tasks table if it exists
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks_backup AS
-            SELECT * FROM tasks WHERE 1=0
-        ''')
-        
-        # Copy existing data if the table exists
-        try:
-            self.cursor.execute('INSERT INTO tasks_backup SELECT * FROM tasks')
-            self.cursor.execute('DROP TABLE tasks')
-        except sqlite3.OperationalError:
-            pass  # Table doesn't exist yet, which is fine
-        
-        # Create new tasks table with updated schema
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                description TEXT,
-                category TEXT,
-                priority TEXT,
-                due_date TEXT,
-                status TEXT DEFAULT 'pending'
-            )
-        ''')
-        
-        # Restore data from backup if it exists
-        try:
-            self.cursor.execute('''
-                INSERT INTO tasks (id, title, description, category, priority, due_date)
-                SELECT id, title, description, category, priority, due_date
-                FROM tasks_backup
-            ''')
-            self.cursor.execute('DROP TABLE tasks_backup')
-        except sqlite3.OperationalError:
-            pass  # No backup table exists, which is fine for new installations
-        
-        # Goals table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS goals (
-                id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                description TEXT,
-                target_date TEXT,
-                progress REAL DEFAULT 0
-            )
-        ''')
-        
-        self.conn.commit()
+    def init_database(self):
+        self.dispatcher = UiDispatcher(self.root)
+        self.db = DatabaseWorker(Repository(), self.dispatcher)
+        self.charts = ChartRenderer(self.dispatcher)
+        self.reminders = ReminderScheduler(self.root, self.db)
+        # Only queues its queries; the results arrive once the window is up
+        self.reminders.start()
+        self.views = ViewCache(self.main_frame, self.db, max_views=VIEW_CACHE_SIZE)
 
     def show_tasks(self):
         from task_manager import TaskManager
-        self.clear_main_frame()
-        TaskManager(self.main_frame, self.conn)
+        self.show_view('tasks', TaskManager, self.reminders)
 
     def show_goals(self):
         from goal_tracker import GoalTracker
-        self.clear_main_frame()
-        GoalTracker(self.main_frame, self.conn)
+        self.show_view('goals', GoalTracker, self.charts)
 
     def show_routines(self):
         from routine_scheduler import RoutineScheduler
-        self.clear_main_frame()
-        RoutineScheduler(self.main_frame, self.conn)
+        self.show_view('routines', RoutineScheduler, self.reminders)
 
     def show_recovery(self):
         from recovery_tracker import RecoveryTracker
-        self.clear_main_frame()
-        RecoveryTracker(self.main_frame, self.conn)
+        self.show_view('recovery', RecoveryTracker)
 
     def show_analytics(self):
         from analytics import Analytics
-        self.clear_main_frame()
-        Analytics(self.main_frame, self.conn)
+        self.show_view('analytics', Analytics, self.charts)
 
-    def clear_main_frame(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
+    def show_view(self, name, view_class, *args):
+        self.welcome_frame.pack_forget()
+        self.views.show(name, view_class, *args)
 
     def run(self):
         self.root.mainloop()
+        self.views.clear()
+        self.reminders.close()
+        self.charts.close()
+        self.db.close()
 
 if __name__ == "__main__":
     app = ModernApp()
@@ -0,0 +1,378 @@
+import sqlite3
+from datetime import date
+from date_codec import register_functions
+from recurrence import days_to_mask
+
+
+def initial_schema(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            category TEXT,
+            priority TEXT,
+            due_date TEXT,
+            status TEXT DEFAULT 'pending'
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS goals (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            target_date TEXT,
+            progress REAL DEFAULT 0
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS routines (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            frequency TEXT,
+            time TEXT,
+            days TEXT,
+            last_completed TEXT,
+            color TEXT
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recovery_logs (
+            id INTEGER PRIMARY KEY,
+            date TEXT,
+            energy_level INTEGER,
+            sleep_hours REAL,
+            physical_activity TEXT,
+            recovery_activity TEXT,
+            notes TEXT
+        )
+    ''')
+
+
+def tasks_status_column(cursor):
+    # Databases created before the status column still carry the old
+    # `completed` flag; add the column in place instead of rebuilding the table
+    columns = table_columns(cursor, 'tasks')
+    if 'status' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN status TEXT DEFAULT 'pending'")
+        if 'completed' in columns:
+            cursor.execute('''
+                UPDATE tasks
+                SET status = CASE WHEN completed = 1 THEN 'completed' ELSE 'pending' END
+            ''')
+
+    # Left behind by the old copy-and-rebuild startup code if it was interrupted
+    cursor.execute('DROP TABLE IF EXISTS tasks_backup')
+
+
+def hot_query_indexes(cursor):
+    # Covering indexes for the list and chart queries registered in
+    # repository.py; each one serves its ORDER BY/GROUP BY without a sort
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_due_date
+        ON tasks (due_date, title, category, priority, status)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_category_status
+        ON tasks (category, status)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_goals_target_date
+        ON goals (target_date, title, progress)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_goals_title ON goals (title)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_recovery_logs_date
+        ON recovery_logs (date, energy_level, sleep_hours)
+    ''')
+
+
+def task_list_order_index(cursor):
+    # The task list orders by (due_date, id) so rows have a stable position;
+    # id has to be an explicit key column for the index to serve that order
+    cursor.execute('DROP INDEX IF EXISTS idx_tasks_due_date')
+    cursor.execute('''
+        CREATE INDEX idx_tasks_due_date
+        ON tasks (due_date, id, title, category, priority, status)
+    ''')
+
+
+def tasks_due_date_not_null(cursor):
+    # Keyset pagination compares (due_date, id) row values, which never match
+    # a NULL; undated tasks get an empty string so they still sort first
+    cursor.execute("UPDATE tasks SET due_date = '' WHERE due_date IS NULL")
+
+
+def task_stats_table(cursor):
+    # Task counts per (category, status), kept current by triggers so the
+    # stat cards and category charts read a few rows instead of all tasks.
+    # Keys are never NULL: a NULL category counts as '' and a NULL status as
+    # 'pending', the same as the task list shows it.
+    cursor.execute('''
+        CREATE TABLE task_stats (
+            category TEXT NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (category, status)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        INSERT INTO task_stats (category, status, count)
+        SELECT IFNULL(category, ''), IFNULL(status, 'pending'), COUNT(*)
+        FROM tasks
+        GROUP BY 1, 2
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER task_stats_insert AFTER INSERT ON tasks
+        BEGIN
+            INSERT INTO task_stats (category, status, count)
+            VALUES (IFNULL(NEW.category, ''), IFNULL(NEW.status, 'pending'), 1)
+            ON CONFLICT (category, status) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER task_stats_delete AFTER DELETE ON tasks
+        BEGIN
+            UPDATE task_stats SET count = count - 1
+            WHERE category = IFNULL(OLD.category, '')
+              AND status = IFNULL(OLD.status, 'pending');
+            DELETE FROM task_stats
+            WHERE category = IFNULL(OLD.category, '')
+              AND status = IFNULL(OLD.status, 'pending')
+              AND count <= 0;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER task_stats_update AFTER UPDATE OF category, status ON tasks
+        WHEN IFNULL(OLD.category, '') != IFNULL(NEW.category, '')
+          OR IFNULL(OLD.status, 'pending') != IFNULL(NEW.status, 'pending')
+        BEGIN
+            UPDATE task_stats SET count = count - 1
+            WHERE category = IFNULL(OLD.category, '')
+              AND status = IFNULL(OLD.status, 'pending');
+            DELETE FROM task_stats
+            WHERE category = IFNULL(OLD.category, '')
+              AND status = IFNULL(OLD.status, 'pending')
+              AND count <= 0;
+            INSERT INTO task_stats (category, status, count)
+            VALUES (IFNULL(NEW.category, ''), IFNULL(NEW.status, 'pending'), 1)
+            ON CONFLICT (category, status) DO UPDATE SET count = count + 1;
+        END
+    ''')
+
+    # Only the old GROUP BY category query used it
+    cursor.execute('DROP INDEX IF EXISTS idx_tasks_category_status')
+
+
+def drop_goal_title_index(cursor):
+    # Goals are looked up by id now; titles don't have to be unique
+    cursor.execute('DROP INDEX IF EXISTS idx_goals_title')
+
+
+def date_day_numbers(cursor):
+    # Every stored date gets an integer day number next to its text (see
+    # date_codec.py), which the indexes below sort and range-scan on.
+    # Existing rows are converted once here; readable text is rewritten
+    # in ISO form, anything else is kept as it is with day 0.
+    register_functions(cursor.connection)
+
+    for table, text_column, day_column in (
+        ('tasks', 'due_date', 'due_day'),
+        ('goals', 'target_date', 'target_day'),
+        ('recovery_logs', 'date', 'day'),
+    ):
+        cursor.execute(
+            f'ALTER TABLE {table} ADD COLUMN {day_column} INTEGER NOT NULL DEFAULT 0'
+        )
+        cursor.execute(f'UPDATE {table} SET {day_column} = to_day({text_column})')
+        cursor.execute(
+            f'UPDATE {table} SET {text_column} = format_day({day_column}) '
+            f'WHERE {day_column} != 0'
+        )
+
+    # Completion times keep their time of day in the text column
+    cursor.execute(
+        'ALTER TABLE routines ADD COLUMN last_completed_day INTEGER NOT NULL DEFAULT 0'
+    )
+    cursor.execute('UPDATE routines SET last_completed_day = to_day(last_completed)')
+
+    cursor.execute('DROP INDEX IF EXISTS idx_tasks_due_date')
+    cursor.execute('''
+        CREATE INDEX idx_tasks_due_day
+        ON tasks (due_day, id, title, category, priority, due_date, status)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_goals_target_date')
+    cursor.execute('''
+        CREATE INDEX idx_goals_target_day
+        ON goals (target_day, title, progress, target_date)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_recovery_logs_date')
+    cursor.execute('''
+        CREATE INDEX idx_recovery_logs_day
+        ON recovery_logs (day, energy_level, sleep_hours, date)
+    ''')
+
+
+def routine_recurrence(cursor):
+    # Weekdays become a bitmask (see recurrence.py) instead of the
+    # comma-separated names in days, which is no longer written. start_day
+    # anchors weekly and monthly repeats; existing routines start today.
+    cursor.connection.create_function('days_to_mask', 1, days_to_mask, deterministic=True)
+    cursor.execute('ALTER TABLE routines ADD COLUMN day_mask INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('UPDATE routines SET day_mask = days_to_mask(days)')
+    cursor.execute('ALTER TABLE routines ADD COLUMN start_day INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('UPDATE routines SET start_day = ?', (date.today().toordinal(),))
+
+
+def routine_completion_day_index(cursor):
+    # Serves the per-day completion counts of the calendar overlay
+    cursor.execute('''
+        CREATE INDEX idx_routines_last_completed_day
+        ON routines (last_completed_day)
+    ''')
+
+
+def routine_completion_log(cursor):
+    # Completions are appended to a log instead of overwriting
+    # routines.last_completed, so history is kept and a completion can be
+    # undone. routine_streaks is the per-routine summary the repository
+    # keeps up to date on each write. The last completion recorded so far
+    # seeds both.
+    cursor.execute('''
+        CREATE TABLE routine_completions (
+            routine_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            completed_at TEXT NOT NULL,
+            PRIMARY KEY (routine_id, day)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_routine_completions_day
+        ON routine_completions (day, routine_id)
+    ''')
+    cursor.execute('''
+        CREATE TABLE routine_streaks (
+            routine_id INTEGER PRIMARY KEY,
+            current INTEGER NOT NULL,
+            longest INTEGER NOT NULL,
+            last_day INTEGER NOT NULL,
+            completions INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO routine_completions (routine_id, day, completed_at)
+        SELECT id, last_completed_day, last_completed
+        FROM routines
+        WHERE last_completed_day != 0
+    ''')
+    cursor.execute('''
+        INSERT INTO routine_streaks (routine_id, current, longest, last_day, completions)
+        SELECT id, 1, 1, last_completed_day, 1
+        FROM routines
+        WHERE last_completed_day != 0
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_routines_last_completed_day')
+
+
+# Tables whose rows carry a change version for incremental exports (see
+# exporter.py), and how a trigger finds the row it fired for
+VERSIONED_TABLES = {
+    'tasks': 'rowid = NEW.rowid',
+    'goals': 'rowid = NEW.rowid',
+    'routines': 'rowid = NEW.rowid',
+    'recovery_logs': 'rowid = NEW.rowid',
+    'routine_completions': 'routine_id = NEW.routine_id AND day = NEW.day',
+}
+
+
+def row_versions(cursor):
+    # Every insert or update stamps the row with the next value of a
+    # database-wide counter, so "changed since" is a comparison against
+    # the counter value an export last reached. Existing rows start at 1.
+    cursor.execute('CREATE TABLE change_counter (value INTEGER NOT NULL)')
+    cursor.execute('INSERT INTO change_counter (value) VALUES (1)')
+    for table, this_row in VERSIONED_TABLES.items():
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        cursor.execute(f'UPDATE {table} SET version = 1')
+        for event in ('INSERT', 'UPDATE'):
+            # The version update inside doesn't fire it again: NEW.version
+            # differs from OLD.version by then
+            when = 'WHEN NEW.version = OLD.version' if event == 'UPDATE' else ''
+            create_version_trigger(cursor, table, this_row, event, when)
+
+
+def create_version_trigger(cursor, table, this_row, event, when):
+    cursor.execute(f'''
+        CREATE TRIGGER {table}_version_{event.lower()} AFTER {event} ON {table}
+        {when}
+        BEGIN
+            UPDATE change_counter SET value = value + 1;
+            UPDATE {table} SET version = (SELECT value FROM change_counter)
+            WHERE {this_row};
+        END
+    ''')
+
+
+def prestamped_row_versions(cursor):
+    # Bulk imports stamp their rows with one version as they insert them;
+    # the insert triggers now only stamp rows that arrive without one,
+    # instead of restamping each imported row with a version of its own
+    for table, this_row in VERSIONED_TABLES.items():
+        cursor.execute(f'DROP TRIGGER IF EXISTS {table}_version_insert')
+        create_version_trigger(cursor, table, this_row, 'INSERT', 'WHEN NEW.version = 0')
+
+
+# Ordered list of schema steps. Step N brings the database to user_version N,
+# so new steps must only ever be appended.
+MIGRATIONS = [
+    initial_schema,
+    tasks_status_column,
+    hot_query_indexes,
+    task_list_order_index,
+    tasks_due_date_not_null,
+    task_stats_table,
+    drop_goal_title_index,
+    date_day_numbers,
+    routine_recurrence,
+    routine_completion_day_index,
+    routine_completion_log,
+    row_versions,
+    prestamped_row_versions,
+]
+
+
+def table_columns(cursor, table):
+    cursor.execute(f'PRAGMA table_info({table})')
+    return {row[1] for row in cursor.fetchall()}
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    version = schema_version(conn)
+    if version > len(MIGRATIONS):
+        raise sqlite3.DatabaseError(
+            f"Database schema version {version} is newer than this application "
+            f"supports ({len(MIGRATIONS)})"
+        )
+
+    cursor = conn.cursor()
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        # Each step and its version bump commit together, so an interrupted
+        # migration is retried from the same step on the next launch
+        cursor.execute('BEGIN')
+        try:
+            step(cursor)
+            cursor.execute(f'PRAGMA user_version = {number}')
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    return schema_version(conn)
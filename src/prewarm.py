@@ -0,0 +1,31 @@
+import importlib
+import threading
+
+# Modules the sections need that are too slow to import before the main
+# window appears. They are imported in the background after first paint so
+# the first visit to a section doesn't stall on them.
+HEAVY_MODULES = (
+    'numpy',
+    'matplotlib.pyplot',
+    'matplotlib.backends.backend_tkagg',
+)
+
+
+def import_modules(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            # The section that needs it will report the error when opened
+            pass
+
+
+def prewarm(modules=HEAVY_MODULES):
+    thread = threading.Thread(
+        target=import_modules,
+        args=(modules,),
+        name="prewarm-imports",
+        daemon=True
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,256 @@
+from collections import namedtuple
+
+# Rolling windows, in days
+WINDOWS = (7, 30, 90)
+
+# Statistics for a range of days. A day with several logs counts once, with
+# the mean of its logs. days holds every calendar day in the range, and
+# energy/sleep the daily means (NaN on days without a log). rolling maps
+# each window to RollingStats arrays aligned with days; the window ending
+# on a day covers that day and the window - 1 before it. by_physical and
+# by_recovery map activity names to (mean energy, logs) over the range.
+RecoverySummary = namedtuple(
+    'RecoverySummary',
+    'first_day last_day days energy sleep rolling logged '
+    'energy_mean energy_var sleep_mean sleep_var correlation '
+    'by_physical by_recovery'
+)
+RollingStats = namedtuple('RollingStats', 'energy_mean energy_var sleep_mean')
+
+# Per-day sums kept for every day from the first log on, and the prefix
+# sums over them that every statistic is read from
+DAY_COLUMNS = ('logs', 'energy', 'sleep')
+PREFIX_COLUMNS = ('days', 'energy', 'energy_sq', 'sleep', 'sleep_sq', 'energy_sleep')
+
+
+def grow(array, size):
+    # Returns the array with room for at least size items, doubling so
+    # appending a day at a time stays cheap
+    import numpy as np
+
+    if len(array) >= size:
+        return array
+    bigger = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    bigger[:len(array)] = array
+    return bigger
+
+
+def ratio(numerator, denominator):
+    import numpy as np
+
+    numerator = np.asarray(numerator, dtype=float)
+    out = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=np.asarray(denominator) > 0)
+    return out
+
+
+class RecoveryHistory:
+    # Every recovery log in contiguous arrays: per-day sums on a grid of
+    # day numbers starting at first_day, prefix sums over the daily means,
+    # and the logs themselves sorted by day for the activity breakdowns.
+    # Any range is then answered from array slices and prefix differences.
+    #
+    # A log for a new latest day only appends to the arrays and extends the
+    # prefix sums by one; a log for an earlier day redoes the prefix sums
+    # from that day on. Summaries are cached per range until a log lands
+    # inside it.
+    def __init__(self):
+        import numpy as np
+
+        self.first_day = None
+        self.size = 0
+        self.day_sums = {name: np.zeros(0) for name in DAY_COLUMNS}
+        self.prefix = {name: np.zeros(1) for name in PREFIX_COLUMNS}
+
+        self.log_count = 0
+        self.log_days = np.zeros(0, dtype=np.int64)
+        self.log_energy = np.zeros(0)
+        self.log_activity = {
+            'physical': np.zeros(0, dtype=np.int64),
+            'recovery': np.zeros(0, dtype=np.int64),
+        }
+        # Activity names are stored as codes into this list
+        self.labels = []
+        self.label_codes = {}
+
+        self.summaries = {}
+
+    def label_code(self, label):
+        label = label or ''
+        code = self.label_codes.get(label)
+        if code is None:
+            code = self.label_codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def load(self, rows):
+        # rows are (day, energy_level, sleep_hours, physical_activity,
+        # recovery_activity) ordered by day
+        import numpy as np
+
+        rows = list(rows)
+        if not rows:
+            return
+        days, energy, sleep, physical, recovery = zip(*rows)
+        days = np.array(days, dtype=np.int64)
+        energy = np.array(energy, dtype=float)
+        sleep = np.array(sleep, dtype=float)
+
+        self.first_day = int(days[0])
+        self.size = int(days[-1]) - self.first_day + 1
+        offsets = days - self.first_day
+        self.day_sums = {
+            'logs': np.bincount(offsets, minlength=self.size).astype(float),
+            'energy': np.bincount(offsets, weights=energy, minlength=self.size),
+            'sleep': np.bincount(offsets, weights=sleep, minlength=self.size),
+        }
+
+        self.log_count = len(rows)
+        self.log_days = days
+        self.log_energy = energy
+        self.log_activity = {
+            'physical': np.array([self.label_code(label) for label in physical], dtype=np.int64),
+            'recovery': np.array([self.label_code(label) for label in recovery], dtype=np.int64),
+        }
+        self.update_prefix(0)
+        self.summaries.clear()
+
+    def add(self, day, energy, sleep, physical, recovery):
+        import numpy as np
+
+        if self.first_day is None:
+            self.first_day = day
+        elif day < self.first_day:
+            # Before everything so far: the grid starts earlier
+            shift = self.first_day - day
+            for name, sums in self.day_sums.items():
+                self.day_sums[name] = np.concatenate([np.zeros(shift), sums[:self.size]])
+            self.first_day = day
+            self.size += shift
+
+        offset = day - self.first_day
+        # Days skipped since the last log need their prefix sums too
+        changed = min(offset, self.size)
+        if offset >= self.size:
+            self.size = offset + 1
+            for name, sums in self.day_sums.items():
+                self.day_sums[name] = grow(sums, self.size)
+                self.day_sums[name][offset:self.size] = 0
+        self.day_sums['logs'][offset] += 1
+        self.day_sums['energy'][offset] += energy
+        self.day_sums['sleep'][offset] += sleep
+
+        # Logs stay sorted by day; a log for the latest day is an append
+        count = self.log_count
+        at = int(np.searchsorted(self.log_days[:count], day, side='right'))
+        self.log_days = self.insert(self.log_days, at, day)
+        self.log_energy = self.insert(self.log_energy, at, energy)
+        for name, label in (('physical', physical), ('recovery', recovery)):
+            self.log_activity[name] = self.insert(self.log_activity[name], at, self.label_code(label))
+        self.log_count += 1
+
+        self.update_prefix(changed)
+        for first_day, last_day in list(self.summaries):
+            if last_day >= day:
+                del self.summaries[(first_day, last_day)]
+
+    def insert(self, array, at, value):
+        array = grow(array, self.log_count + 1)
+        array[at + 1:self.log_count + 1] = array[at:self.log_count]
+        array[at] = value
+        return array
+
+    def update_prefix(self, offset):
+        # Redoes the prefix sums from a grid offset to the end
+        import numpy as np
+
+        logs = self.day_sums['logs'][offset:self.size]
+        logged = (logs > 0).astype(float)
+        energy = np.nan_to_num(ratio(self.day_sums['energy'][offset:self.size], logs))
+        sleep = np.nan_to_num(ratio(self.day_sums['sleep'][offset:self.size], logs))
+        columns = {
+            'days': logged,
+            'energy': energy,
+            'energy_sq': energy * energy,
+            'sleep': sleep,
+            'sleep_sq': sleep * sleep,
+            'energy_sleep': energy * sleep,
+        }
+        for name, values in columns.items():
+            prefix = grow(self.prefix[name], self.size + 1)
+            prefix[offset + 1:self.size + 1] = prefix[offset] + np.cumsum(values)
+            self.prefix[name] = prefix
+
+    def totals(self, first_days, last_days):
+        # Sums of each prefix column over [first_day, last_day] ranges;
+        # days outside the grid contribute nothing
+        import numpy as np
+
+        if self.first_day is None:
+            zeros = np.zeros(np.shape(last_days))
+            return {name: zeros for name in PREFIX_COLUMNS}
+        end = np.clip(np.asarray(last_days) - self.first_day + 1, 0, self.size)
+        start = np.clip(np.asarray(first_days) - self.first_day, 0, self.size)
+        return {name: prefix[end] - prefix[start] for name, prefix in self.prefix.items()}
+
+    def summary(self, first_day, last_day):
+        cached = self.summaries.get((first_day, last_day))
+        if cached is None:
+            cached = self.summaries[(first_day, last_day)] = self.compute(first_day, last_day)
+        return cached
+
+    def compute(self, first_day, last_day):
+        import numpy as np
+
+        days = np.arange(first_day, last_day + 1)
+
+        # Daily means on the days of the range that are on the grid
+        energy = np.full(len(days), np.nan)
+        sleep = np.full(len(days), np.nan)
+        if self.first_day is not None:
+            offsets = days - self.first_day
+            on_grid = (offsets >= 0) & (offsets < self.size)
+            grid = offsets[on_grid]
+            logs = self.day_sums['logs'][grid]
+            energy[on_grid] = ratio(self.day_sums['energy'][grid], logs)
+            sleep[on_grid] = ratio(self.day_sums['sleep'][grid], logs)
+
+        rolling = {}
+        for window in WINDOWS:
+            sums = self.totals(days - window + 1, days)
+            mean = ratio(sums['energy'], sums['days'])
+            rolling[window] = RollingStats(
+                mean,
+                np.maximum(ratio(sums['energy_sq'], sums['days']) - mean * mean, 0),
+                ratio(sums['sleep'], sums['days'])
+            )
+
+        sums = {name: float(total) for name, total in self.totals(first_day, last_day).items()}
+        n = sums['days']
+        energy_mean = float(ratio(sums['energy'], n))
+        sleep_mean = float(ratio(sums['sleep'], n))
+        energy_var = max(float(ratio(sums['energy_sq'], n)) - energy_mean ** 2, 0) if n else float('nan')
+        sleep_var = max(float(ratio(sums['sleep_sq'], n)) - sleep_mean ** 2, 0) if n else float('nan')
+        covariance = float(ratio(sums['energy_sleep'], n)) - energy_mean * sleep_mean
+        correlation = float(ratio(covariance, np.sqrt(energy_var * sleep_var))) if n > 1 else float('nan')
+
+        # Activity breakdowns from the logs in the range
+        count = self.log_count
+        start = int(np.searchsorted(self.log_days[:count], first_day, side='left'))
+        end = int(np.searchsorted(self.log_days[:count], last_day, side='right'))
+        groups = {}
+        for name, codes in self.log_activity.items():
+            codes = codes[start:end]
+            logs = np.bincount(codes, minlength=len(self.labels))
+            totals = np.bincount(codes, weights=self.log_energy[start:end], minlength=len(self.labels))
+            groups[name] = {
+                self.labels[code]: (float(totals[code] / logs[code]), int(logs[code]))
+                for code in np.flatnonzero(logs)
+                if self.labels[code]
+            }
+
+        return RecoverySummary(
+            first_day, last_day, days, energy, sleep, rolling, int(n),
+            energy_mean, energy_var, sleep_mean, sleep_var, correlation,
+            groups['physical'], groups['recovery']
+        )
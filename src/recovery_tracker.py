@@ -1,26 +1,36 @@
 import tkinter as tk
 from tkinter import ttk
+import numpy as np
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from datetime import datetime, timedelta
+from datetime import date
+from date_codec import format_day, from_day, to_day
+from repository import RecoveryPoint
+from downsample import for_width
+
+# Days in view when the chart opens; the wheel zooms out to the whole
+# history, and in to MIN_VIEW_DAYS
+CHART_DAYS = 14
+MIN_VIEW_DAYS = 3
+ZOOM_STEP = 1.5
+# Room left past the last point and above the highest one, so most new logs
+# land inside the current axes and only need a blit
+X_HEADROOM_DAYS = 7
+Y_HEADROOM = 2
 
 class RecoveryTracker:
-    def __init__(self, parent, conn):
+    tables = ('recovery_logs',)
+
+    def __init__(self, parent, db):
         self.parent = parent
-        self.conn = conn
-        self.cursor = conn.cursor()
-        
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS recovery_logs (
-                id INTEGER PRIMARY KEY,
-                date TEXT,
-                energy_level INTEGER,
-                sleep_hours REAL,
-                physical_activity TEXT,
-                recovery_activity TEXT,
-                notes TEXT
-            )
-        ''')
+        self.db = db
+        # Every log's date number and values, oldest first
+        self.dates = np.zeros(0)
+        self.energy = np.zeros(0)
+        self.sleep = np.zeros(0)
+        # Figure without the lines, saved after each full draw
+        self.background = None
         
         self.setup_ui()
         self.load_recovery_data()
@@ -72,47 +82,140 @@ class RecoveryTracker:
         right_frame = ttk.Frame(container)
         container.add(right_frame)
 
-        # Energy level trend chart
+        # Energy level trend chart. The axes are set up once; the two lines
+        # are animated artists, left out of full draws and blitted over the
+        # saved background whenever only the data changes.
         self.fig, self.ax = plt.subplots(figsize=(8, 6))
+        self.energy_line, = self.ax.plot([], [], 'b-', label='Energy Level', animated=True)
+        self.sleep_line, = self.ax.plot([], [], 'r-', label='Sleep Hours', animated=True)
+        self.ax.set_xlabel('Date')
+        self.ax.set_ylabel('Level')
+        self.ax.legend(handles=[self.energy_line, self.sleep_line])
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        self.ax.tick_params(axis='x', rotation=45)
+
         self.canvas = FigureCanvasTkAgg(self.fig, master=right_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.mpl_connect('resize_event', self.on_resize)
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+
+    def refresh(self):
+        self.load_recovery_data()
+
+    def close(self):
+        plt.close(self.fig)
 
     def save_recovery_log(self):
-        self.cursor.execute('''
-            INSERT INTO recovery_logs 
-            (date, energy_level, sleep_hours, physical_activity, recovery_activity, notes)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            datetime.now().strftime('%Y-%m-%d'),
-            self.energy_var.get(),
-            float(self.sleep_var.get()),
+        day = to_day(date.today())
+        point = RecoveryPoint(format_day(day), self.energy_var.get(), float(self.sleep_var.get()), day)
+        self.db.submit(
+            'add_recovery_log',
+            point.day,
+            point.energy_level,
+            point.sleep_hours,
             self.activity_var.get(),
             self.recovery_var.get(),
-            self.notes_text.get("1.0", tk.END.strip())
-        ))
-        self.conn.commit()
-        self.load_recovery_data()
+            self.notes_text.get("1.0", tk.END.strip()),
+            callback=lambda _: self.add_point(point)
+        )
 
     def load_recovery_data(self):
-        self.cursor.execute('''
-            SELECT date, energy_level, sleep_hours 
-            FROM recovery_logs 
-            ORDER BY date DESC 
-            LIMIT 14
-        ''')
-        data = self.cursor.fetchall()
-        
-        if data:
-            dates = [row[0] for row in data]
-            energy = [row[1] for row in data]
-            sleep = [row[2] for row in data]
-            
-            self.ax.clear()
-            self.ax.plot(dates, energy, 'b-', label='Energy Level')
-            self.ax.plot(dates, sleep, 'r-', label='Sleep Hours')
-            self.ax.set_xlabel('Date')
-            self.ax.set_ylabel('Level')
-            self.ax.legend()
-            self.ax.tick_params(axis='x', rotation=45)
-            self.fig.tight_layout()
-            self.canvas.draw()
\ No newline at end of file
+        self.db.submit('recovery_points', callback=self.plot_recovery_data)
+
+    def plot_recovery_data(self, data):
+        # The full history, oldest first. It stays here at full resolution
+        # and only the part in view is thinned out and plotted.
+        self.dates = np.array([mdates.date2num(from_day(point.day)) for point in data])
+        self.energy = np.array([point.energy_level for point in data], dtype=float)
+        self.sleep = np.array([point.sleep_hours for point in data], dtype=float)
+        if len(self.dates):
+            last = self.dates[-1]
+            self.ax.set_xlim(last - CHART_DAYS, last + X_HEADROOM_DAYS)
+        self.redraw()
+
+    def add_point(self, point):
+        # The log just saved goes in by date, so no need to query again.
+        # It usually lands on the end, but imported logs can be dated later.
+        date_number = mdates.date2num(from_day(point.day))
+        first_point = not len(self.dates)
+        at = int(np.searchsorted(self.dates, date_number, side='right'))
+        self.dates = np.insert(self.dates, at, date_number)
+        self.energy = np.insert(self.energy, at, point.energy_level)
+        self.sleep = np.insert(self.sleep, at, point.sleep_hours)
+
+        left, right = self.ax.get_xlim()
+        top = self.ax.get_ylim()[1]
+        if first_point:
+            # Nothing has set the limits yet
+            self.ax.set_xlim(date_number - CHART_DAYS, date_number + X_HEADROOM_DAYS)
+            self.redraw()
+        elif self.background is None or not left <= date_number <= right:
+            # Scroll the view along to the new point, keeping its width
+            width = right - left
+            if date_number > right:
+                left = date_number + X_HEADROOM_DAYS - width
+            elif date_number < left:
+                left = date_number - 1
+            self.ax.set_xlim(left, left + width)
+            self.redraw()
+        elif max(point.energy_level, point.sleep_hours) > top:
+            self.redraw()
+        else:
+            self.decimate()
+            self.blit()
+
+    def decimate(self):
+        # Fits the lines to what is in view at the axes' pixel width
+        left, right = self.ax.get_xlim()
+        pixels = self.ax.bbox.width
+        self.energy_line.set_data(*for_width(self.dates, self.energy, pixels, left, right))
+        self.sleep_line.set_data(*for_width(self.dates, self.sleep, pixels, left, right))
+
+    def redraw(self):
+        # New limits mean new ticks, so the whole figure is drawn again and
+        # on_draw saves the new background
+        self.decimate()
+        values = np.concatenate([self.energy_line.get_ydata(), self.sleep_line.get_ydata()])
+        top = values.max() if len(values) else 0
+        self.ax.set_ylim(0, max(10, top) + Y_HEADROOM)
+        self.background = None
+        self.fig.tight_layout()
+        self.canvas.draw_idle()
+
+    def on_scroll(self, event):
+        # The wheel zooms the dates around the pointer, out as far as the
+        # whole history and the headroom after it, and never past either end
+        if event.inaxes is not self.ax or not len(self.dates):
+            return
+        scale = 1 / ZOOM_STEP if event.button == 'up' else ZOOM_STEP
+        left, right = self.ax.get_xlim()
+        first, last = self.dates[0], self.dates[-1] + X_HEADROOM_DAYS
+        width = min(max((right - left) * scale, MIN_VIEW_DAYS), max(last - first, MIN_VIEW_DAYS))
+        centre = event.xdata
+        share = (centre - left) / (right - left)
+        left = centre - width * share
+        left = max(min(left, last - width), first)
+        self.ax.set_xlim(left, left + width)
+        self.redraw()
+
+    def on_resize(self, event):
+        # The draw that follows a resize picks up the new point count
+        self.decimate()
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_lines()
+
+    def draw_lines(self):
+        self.ax.draw_artist(self.energy_line)
+        self.ax.draw_artist(self.sleep_line)
+
+    def blit(self):
+        if self.background is None:
+            # Not drawn yet; the first draw brings the lines with it
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_lines()
+        self.canvas.blit(self.fig.bbox)
\ No newline at end of file
@@ -0,0 +1,206 @@
+import calendar
+from datetime import date
+
+DAILY = 'Daily'
+WEEKLY = 'Weekly'
+MONTHLY = 'Monthly'
+
+# Routine weekdays are stored as a bitmask, bit 0 for Monday through bit 6
+# for Sunday, matching date.weekday()
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+ALL_DAYS = (1 << len(WEEKDAYS)) - 1
+
+UNIX_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def days_to_mask(days):
+    # From the comma-separated names older versions stored
+    names = {name.strip() for name in (days or '').split(',')}
+    return sum(1 << i for i, name in enumerate(WEEKDAYS) if name in names)
+
+
+def weekdays(days):
+    # Day number 1 (0001-01-01) was a Monday
+    return (days - 1) % 7
+
+
+def month_days(days):
+    # Day of the month and length of the month for each day number
+    import numpy as np
+
+    dates = np.asarray(days - UNIX_EPOCH_DAY).astype('datetime64[D]')
+    month_start = dates.astype('datetime64[M]')
+    first = month_start.astype('datetime64[D]')
+    day_of_month = (dates - first).astype(int) + 1
+    month_length = ((month_start + 1).astype('datetime64[D]') - first).astype(int)
+    return day_of_month, month_length
+
+
+def expand(routines, first_day, last_day):
+    # Every occurrence of the routines between two day numbers (inclusive),
+    # worked out for all routines and days at once. Returns the day numbers
+    # and routine indexes of the occurrences, ordered by day and then by
+    # position in routines.
+    #
+    # Daily routines fall on every day, or only on the weekdays in day_mask
+    # if it has any. Weekly ones fall on the weekdays in day_mask, or on
+    # the weekday they started. Monthly ones fall on the day of the month
+    # they started, or the last day of shorter months. Nothing occurs
+    # before a routine's start_day.
+    import numpy as np
+
+    days = np.arange(first_day, last_day + 1)
+    if not len(routines) or not len(days):
+        return days[:0], np.zeros(0, dtype=int)
+
+    frequency = np.array([routine.frequency or DAILY for routine in routines])
+    mask = np.array([routine.day_mask for routine in routines])
+    start = np.array([routine.start_day for routine in routines])
+
+    day_of_month, month_length = month_days(days)
+    start_day_of_month, _ = month_days(start)
+
+    weekly_mask = np.where(mask != 0, mask, 1 << weekdays(start))
+    daily_mask = np.where(mask != 0, mask, ALL_DAYS)
+    rule_mask = np.where(frequency == WEEKLY, weekly_mask, daily_mask)
+
+    on_weekday = (rule_mask[:, None] >> weekdays(days)[None, :]) & 1 == 1
+    on_month_day = (
+        np.minimum(start_day_of_month[:, None], month_length[None, :])
+        == day_of_month[None, :]
+    )
+    hits = np.where((frequency == MONTHLY)[:, None], on_month_day, on_weekday)
+    hits &= days[None, :] >= start[:, None]
+
+    day_index, routine_index = np.nonzero(hits.T)
+    return days[day_index], routine_index
+
+
+class OccurrenceIndex:
+    # Routines by day for one month, rebuilt only when another month is
+    # asked for or the routines change. Looking up a day is then a single
+    # dict access that returns just that day's routines, ordered by time.
+    def __init__(self, routines=()):
+        self.set_routines(routines)
+
+    def set_routines(self, routines):
+        self.routines = sorted(routines, key=lambda routine: (routine.time or '', routine.id))
+        self.month = None
+        self.by_day = {}
+
+    def month_index(self, year, month):
+        if self.month != (year, month):
+            import numpy as np
+
+            first = date(year, month, 1).toordinal()
+            last = first + calendar.monthrange(year, month)[1] - 1
+            days, indexes = expand(self.routines, first, last)
+
+            # Occurrences come sorted by day; split them into one run per day
+            starts = np.flatnonzero(np.diff(days)) + 1
+            self.by_day = {
+                int(run_days[0]): [self.routines[i] for i in run_indexes]
+                for run_days, run_indexes in zip(np.split(days, starts), np.split(indexes, starts))
+                if len(run_days)
+            }
+            self.month = (year, month)
+        return self.by_day
+
+    def on(self, day):
+        # day is a date
+        return self.month_index(day.year, day.month).get(day.toordinal(), [])
+
+
+def weekday_mask(routine):
+    # The weekdays a daily or weekly routine falls on, as in expand()
+    if routine.day_mask:
+        return routine.day_mask
+    return 1 << weekdays(routine.start_day) if routine.frequency == WEEKLY else ALL_DAYS
+
+
+def monthly_day(routine, year, month):
+    # Day number of a monthly routine's occurrence in a month
+    anchor = date.fromordinal(routine.start_day).day
+    return date(year, month, min(anchor, calendar.monthrange(year, month)[1])).toordinal()
+
+
+def next_occurrence(routine, day):
+    # First day number on or after day that the routine falls on
+    day = max(day, routine.start_day)
+    if routine.frequency == MONTHLY:
+        first = date.fromordinal(day)
+        occurrence = monthly_day(routine, first.year, first.month)
+        if occurrence < day:
+            year, month = divmod(first.year * 12 + first.month, 12)
+            occurrence = monthly_day(routine, year, month + 1)
+        return occurrence
+
+    mask = weekday_mask(routine)
+    return next(day + i for i in range(7) if (mask >> weekdays(day + i)) & 1)
+
+
+def count_occurrences(routine, first_day, last_day):
+    # How many times a routine occurs between two day numbers (inclusive),
+    # in constant time for daily and weekly routines
+    first_day = max(first_day, routine.start_day)
+    if last_day < first_day:
+        return 0
+
+    if routine.frequency == MONTHLY:
+        first, last = date.fromordinal(first_day), date.fromordinal(last_day)
+
+        def in_range(year, month):
+            return first_day <= monthly_day(routine, year, month) <= last_day
+
+        months = (last.year - first.year) * 12 + last.month - first.month
+        if months == 0:
+            return int(in_range(first.year, first.month))
+        # Every month strictly between the two has its occurrence in range
+        return in_range(first.year, first.month) + in_range(last.year, last.month) + months - 1
+
+    mask = weekday_mask(routine)
+    weeks, extra = divmod(last_day - first_day + 1, 7)
+    start = weekdays(first_day)
+    return weeks * bin(mask).count('1') + sum(
+        (mask >> ((start + i) % 7)) & 1 for i in range(extra)
+    )
+
+
+# Streaks count completions in a row: a streak carries on from one
+# completion to the next as long as no scheduled occurrence was missed in
+# between. A completion later than the last one extends a streak in
+# constant time; anything else rebuilds it from that routine's days.
+
+def extend_streak(streak, routine, day):
+    current = 1
+    if streak.last_day and not count_occurrences(routine, streak.last_day + 1, day - 1):
+        current = streak.current + 1
+    return streak._replace(
+        current=current,
+        longest=max(streak.longest, current),
+        last_day=day,
+        completions=streak.completions + 1
+    )
+
+
+def rebuild_streak(empty, routine, days):
+    # days in ascending order
+    streak = empty
+    for day in days:
+        streak = extend_streak(streak, routine, day)
+    return streak
+
+
+def current_streak(streak, routine, today):
+    # A streak lasts until an occurrence goes by without a completion;
+    # today's occurrence still counts as pending
+    if streak is None or count_occurrences(routine, streak.last_day + 1, today - 1):
+        return 0
+    return streak.current
+
+
+def completion_rate(streak, routine, today):
+    scheduled = count_occurrences(routine, routine.start_day, today)
+    if streak is None or not scheduled:
+        return 0.0
+    return min(streak.completions / scheduled, 1.0)
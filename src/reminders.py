@@ -0,0 +1,206 @@
+import heapq
+import itertools
+import sys
+from datetime import datetime, time, timedelta
+from date_codec import from_day
+from recurrence import next_occurrence
+
+APP_NAME = "Personal Management Tool"
+
+# Tasks only have a due date, so their reminder goes off at this time of day
+TASK_REMINDER_TIME = time(9, 0)
+
+# Tasks in these states never remind
+CLOSED_STATUSES = ('completed', 'abandoned')
+
+# The timer never waits longer than this, so a clock change or a machine
+# coming back from sleep is noticed within the hour
+MAX_TIMER_MS = 60 * 60 * 1000
+
+# Cancelled entries stay in the heap until they reach the top; once they
+# make up this much of it, the heap is rebuilt without them
+STALE_FRACTION = 0.5
+
+
+class PlyerBackend:
+    # Desktop notifications through plyer
+    def __init__(self):
+        from plyer import notification
+        self.notification = notification
+
+    def notify(self, title, message):
+        self.notification.notify(title=title, message=message, app_name=APP_NAME)
+
+
+class StubBackend:
+    # Keeps the notifications in a list instead of showing them
+    def __init__(self):
+        self.sent = []
+
+    def notify(self, title, message):
+        self.sent.append((title, message))
+
+
+def default_backend():
+    try:
+        return PlyerBackend()
+    except ImportError:
+        # Reminders still run on schedule; there is just nowhere to show them
+        return StubBackend()
+
+
+def parse_time(text):
+    # Routine times are stored as HH:MM
+    try:
+        return datetime.strptime(text, '%H:%M').time()
+    except (TypeError, ValueError):
+        return None
+
+
+class ReminderScheduler:
+    # Upcoming routine occurrences and task deadlines in a min-heap ordered
+    # by when they are due. A single root.after timer is armed for the
+    # earliest one and re-armed only when that changes, so nothing polls.
+    #
+    # Each routine and task has at most one entry, keyed ('routine', id) or
+    # ('task', id). Scheduling is a heap push; cancelling just marks the
+    # entry dead, and dead entries are dropped when they reach the top.
+    # A routine's next occurrence is pushed when its reminder fires.
+    def __init__(self, root, db, backend=None, clock=datetime.now):
+        self.root = root
+        self.db = db
+        self.backend = backend or default_backend()
+        self.clock = clock
+        # Entries are [when, sequence, key, title, message]; key is None
+        # once cancelled
+        self.heap = []
+        self.entries = {}
+        self.stale = 0
+        self.sequence = itertools.count()
+        self.routines = {}
+        self.after_id = None
+        self.timer_due = None
+
+    def start(self):
+        today = self.clock().toordinal()
+        self.db.submit('routines', callback=self.schedule_routines)
+        self.db.submit('upcoming_tasks', today, callback=self.schedule_tasks)
+
+    def close(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    # Routines
+
+    def schedule_routines(self, routines):
+        for routine in routines:
+            self.schedule_routine(routine, arm=False)
+        self.arm()
+
+    def schedule_routine(self, routine, after=None, arm=True):
+        # Reminds at the routine's next occurrence at or after `after`
+        self.routines[routine.id] = routine
+        at = parse_time(routine.time)
+        if at is None:
+            self.cancel(('routine', routine.id), arm)
+            return
+
+        after = after or self.clock()
+        day = next_occurrence(routine, after.toordinal())
+        when = datetime.combine(from_day(day), at)
+        if when < after:
+            # Today's occurrence has already gone by
+            when = datetime.combine(from_day(next_occurrence(routine, day + 1)), at)
+        self.push(('routine', routine.id), when, "Routine reminder",
+                  f"{routine.title} at {routine.time}", arm)
+
+    def routine_completed(self, routine, day):
+        # Done already, so that day's reminder moves on to the next occurrence
+        entry = self.entries.get(('routine', routine.id))
+        if entry is not None and entry[0].toordinal() == day:
+            self.schedule_routine(routine, datetime.combine(from_day(day + 1), time.min))
+
+    # Tasks
+
+    def schedule_tasks(self, tasks):
+        for task in tasks:
+            self.schedule_task(task, arm=False)
+        self.arm()
+
+    def schedule_task(self, task, arm=True):
+        # Called again whenever a task changes; completed or abandoned tasks,
+        # tasks without a due date and deadlines already past are dropped
+        key = ('task', task.id)
+        if task.status in CLOSED_STATUSES or not task.due_day:
+            self.cancel(key, arm)
+            return
+        when = datetime.combine(from_day(task.due_day), TASK_REMINDER_TIME)
+        if when < self.clock():
+            self.cancel(key, arm)
+            return
+        self.push(key, when, "Task due today", task.title, arm)
+
+    def cancel_task(self, task_id):
+        self.cancel(('task', task_id))
+
+    # Heap
+
+    def push(self, key, when, title, message, arm=True):
+        self.cancel(key, arm=False)
+        entry = [when, next(self.sequence), key, title, message]
+        heapq.heappush(self.heap, entry)
+        self.entries[key] = entry
+        if arm:
+            self.arm()
+
+    def cancel(self, key, arm=True):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        entry[2] = None
+        self.stale += 1
+        if self.stale > len(self.heap) * STALE_FRACTION:
+            self.heap = [entry for entry in self.heap if entry[2] is not None]
+            heapq.heapify(self.heap)
+            self.stale = 0
+        if arm:
+            self.arm()
+
+    def next_entry(self):
+        while self.heap and self.heap[0][2] is None:
+            heapq.heappop(self.heap)
+            self.stale -= 1
+        return self.heap[0] if self.heap else None
+
+    def arm(self):
+        # Points the timer at the earliest entry, leaving it alone if it
+        # already is
+        entry = self.next_entry()
+        due = entry[0] if entry else None
+        if self.after_id is not None and due == self.timer_due:
+            return
+        self.close()
+        self.timer_due = due
+        if entry is None:
+            return
+        delay = (due - self.clock()) / timedelta(milliseconds=1)
+        self.after_id = self.root.after(int(min(max(delay, 0), MAX_TIMER_MS)), self.fire)
+
+    def fire(self):
+        self.after_id = None
+        now = self.clock()
+        while True:
+            entry = self.next_entry()
+            if entry is None or entry[0] > now:
+                break
+            when, _, key, title, message = heapq.heappop(self.heap)
+            del self.entries[key]
+            try:
+                self.backend.notify(title, message)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+            kind, item_id = key
+            if kind == 'routine':
+                self.schedule_routine(self.routines[item_id], when + timedelta(seconds=1), arm=False)
+        self.arm()
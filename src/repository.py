@@ -0,0 +1,468 @@
+import sqlite3
+from collections import defaultdict, namedtuple
+from migrations import migrate
+from date_codec import format_day
+from recurrence import extend_streak, rebuild_streak
+from recovery_stats import RecoveryHistory
+from importer import import_path
+
+DATABASE_PATH = 'personal_management.db'
+
+# Connection profile applied once when the repository opens the database.
+# WAL lets readers run alongside the single writer, NORMAL sync is safe in WAL
+# mode, and the mmap/page cache keep the working set out of read() syscalls.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('cache_size', -32 * 1024),  # negative means KiB, so 32 MiB
+    ('temp_store', 'MEMORY'),
+)
+STATEMENT_CACHE_SIZE = 256
+
+# Row types returned by the query methods. Fields follow the column order of
+# the SELECT, so they can still be indexed like the raw tuples they replace.
+# *_day fields are the date_codec day numbers behind the date text.
+Task = namedtuple('Task', 'id title description category priority due_date status due_day')
+TaskRow = namedtuple('TaskRow', 'id title category priority due_date status due_day')
+Goal = namedtuple('Goal', 'id title description target_date progress target_day')
+GoalRow = namedtuple('GoalRow', 'id title target_date progress target_day')
+Routine = namedtuple('Routine', 'id title frequency time day_mask color start_day')
+RoutineStreak = namedtuple('RoutineStreak', 'routine_id current longest last_day completions')
+RecoveryPoint = namedtuple('RecoveryPoint', 'date energy_level sleep_hours day')
+CategoryStats = namedtuple('CategoryStats', 'category total completed')
+# completed is the set of routine ids done that day
+DayActivity = namedtuple('DayActivity', 'day tasks_due completions energy completed')
+TaskTotals = namedtuple('TaskTotals', 'total completed')
+
+# Every read the views issue is registered here so verify_query_plans() can
+# check that none of them degrades into a full table scan or a temp-table sort.
+# allow_scan lists tables a query is meant to read in full, whether through
+# the table or one of its indexes.
+RegisteredQuery = namedtuple('RegisteredQuery', 'name sql sample_params allow_scan')
+QUERIES = {}
+
+
+def register_query(name, sql, sample_params=(), allow_scan=()):
+    QUERIES[name] = RegisteredQuery(name, sql, sample_params, frozenset(allow_scan))
+    return sql
+
+
+# The task list is paged with keyset pagination on (due_day, id): each page
+# starts right after (or before) the key of the last row already shown, so
+# every page is an index seek no matter how deep into the table it is.
+TASKS_FIRST_PAGE = register_query('tasks_first_page', '''
+    SELECT id, title, category, priority, due_date, IFNULL(status, 'pending'), due_day
+    FROM tasks
+    ORDER BY due_day, id
+    LIMIT ?
+''', (200,))
+TASKS_AFTER = register_query('tasks_after', '''
+    SELECT id, title, category, priority, due_date, IFNULL(status, 'pending'), due_day
+    FROM tasks
+    WHERE (due_day, id) > (?, ?)
+    ORDER BY due_day, id
+    LIMIT ?
+''', (0, 0, 200))
+TASKS_BEFORE = register_query('tasks_before', '''
+    SELECT id, title, category, priority, due_date, IFNULL(status, 'pending'), due_day
+    FROM tasks
+    WHERE (due_day, id) < (?, ?)
+    ORDER BY due_day DESC, id DESC
+    LIMIT ?
+''', (0, 0, 200))
+# Tasks still to do from a day on, for the reminder scheduler; completed
+# and abandoned ones are done with
+UPCOMING_TASKS = register_query('upcoming_tasks', '''
+    SELECT id, title, category, priority, due_date, IFNULL(status, 'pending'), due_day
+    FROM tasks
+    WHERE due_day >= ? AND IFNULL(status, 'pending') NOT IN ('completed', 'abandoned')
+''', (0,))
+TASK_BY_ID = register_query('task_by_id', '''
+    SELECT id, title, description, category, priority, due_date, status, due_day
+    FROM tasks
+    WHERE id = ?
+''', (0,))
+# Both read the trigger-maintained task_stats table (see migrations.py),
+# which has one row per (category, status) pair, so scanning it is cheap
+TASK_TOTALS = register_query('task_totals', '''
+    SELECT IFNULL(SUM(count), 0),
+           IFNULL(SUM(CASE WHEN status = 'completed' THEN count ELSE 0 END), 0)
+    FROM task_stats
+''', allow_scan=('task_stats',))
+TASK_CATEGORY_STATS = register_query('task_category_stats', '''
+    SELECT category, SUM(count),
+           SUM(CASE WHEN status = 'completed' THEN count ELSE 0 END)
+    FROM task_stats
+    GROUP BY category
+''', allow_scan=('task_stats',))
+# Every goal, in target order read straight off the index
+GOALS_BY_TARGET_DAY = register_query('goals_by_target_day', '''
+    SELECT id, title, target_date, progress, target_day
+    FROM goals
+    ORDER BY target_day
+''', allow_scan=('goals',))
+GOAL_BY_ID = register_query('goal_by_id', '''
+    SELECT id, title, description, target_date, progress, target_day
+    FROM goals
+    WHERE id = ?
+''', (0,))
+# The goal tracker keeps every goal in memory (see goal_store.py) and
+# orders them itself
+ALL_GOALS = register_query('all_goals', '''
+    SELECT id, title, description, target_date, progress, target_day
+    FROM goals
+''', allow_scan=('goals',))
+ALL_ROUTINES = register_query('all_routines', '''
+    SELECT id, title, frequency, time, day_mask, color, start_day
+    FROM routines
+''', allow_scan=('routines',))
+ROUTINE_BY_ID = register_query('routine_by_id', '''
+    SELECT id, title, frequency, time, day_mask, color, start_day
+    FROM routines
+    WHERE id = ?
+''', (0,))
+# Completions are an append-only log keyed by (routine_id, day);
+# routine_streaks keeps a summary per routine that complete_routine updates
+# as it appends, so streaks never need the whole log
+ROUTINE_STREAKS = register_query('routine_streaks', '''
+    SELECT routine_id, current, longest, last_day, completions
+    FROM routine_streaks
+''', allow_scan=('routine_streaks',))
+ROUTINE_STREAK = register_query('routine_streak', '''
+    SELECT routine_id, current, longest, last_day, completions
+    FROM routine_streaks
+    WHERE routine_id = ?
+''', (0,))
+COMPLETION_DAYS = register_query('completion_days', '''
+    SELECT day
+    FROM routine_completions
+    WHERE routine_id = ?
+    ORDER BY day
+''', (0,))
+# Per-day totals for the calendar overlay, one grouped index range per
+# table. Each row is tagged with the DayActivity field it fills; the
+# routines completed on a day come as a comma-separated list of ids.
+DAY_ACTIVITY = register_query('day_activity', '''
+    SELECT 'tasks_due', due_day, COUNT(*)
+    FROM tasks
+    WHERE due_day BETWEEN ? AND ?
+    GROUP BY due_day
+    UNION ALL
+    SELECT 'completed', day, group_concat(routine_id)
+    FROM routine_completions
+    WHERE day BETWEEN ? AND ?
+    GROUP BY day
+    UNION ALL
+    SELECT 'energy', day, AVG(energy_level)
+    FROM recovery_logs
+    WHERE day BETWEEN ? AND ?
+    GROUP BY day
+''', (0, 0) * 3)
+# Every dated log for the recovery chart, which thins them out itself
+RECOVERY_POINTS = register_query('recovery_points', '''
+    SELECT date, energy_level, sleep_hours, day
+    FROM recovery_logs
+    WHERE day != 0
+    ORDER BY day
+''', allow_scan=('recovery_logs',))
+# Loaded once into a RecoveryHistory, which recovery_stats answers from;
+# logs without a date are left out
+RECOVERY_HISTORY = register_query('recovery_history', '''
+    SELECT day, energy_level, sleep_hours, physical_activity, recovery_activity
+    FROM recovery_logs
+    WHERE day != 0
+    ORDER BY day
+''', allow_scan=('recovery_logs',))
+
+
+class QueryPlanError(sqlite3.DatabaseError):
+    pass
+
+
+def query_plan_problems(conn, query):
+    # Any SCAN reads the whole table or index, so it is only allowed on the
+    # tables in allow_scan. The one exception is a page: a LIMIT query
+    # walking an index in its ORDER BY order stops after LIMIT rows. A plain
+    # table scan is never one, LIMIT or not, since a WHERE can make it read
+    # everything first; an index that doesn't give the order shows up as a
+    # temp b-tree.
+    problems = []
+    keywords = query.sql.upper().split()
+    paged = 'LIMIT' in keywords and 'ORDER' in keywords
+    for row in conn.execute('EXPLAIN QUERY PLAN ' + query.sql, query.sample_params):
+        detail = row[3]
+        words = detail.split()
+        if words[0] == 'SCAN' and words[1] not in query.allow_scan:
+            if not (paged and words[2:3] == ['USING'] and 'INDEX' in words[3:5]):
+                problems.append(detail)
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append(detail)
+    return problems
+
+
+def verify_query_plans(conn):
+    failures = {}
+    for query in QUERIES.values():
+        problems = query_plan_problems(conn, query)
+        if problems:
+            failures[query.name] = problems
+
+    if failures:
+        report = '; '.join(
+            f"{name}: {', '.join(problems)}" for name, problems in failures.items()
+        )
+        raise QueryPlanError(f"Queries without a usable index: {report}")
+
+
+class Repository:
+    def __init__(self, path=DATABASE_PATH):
+        self.path = path
+        self.versions = defaultdict(int)
+        # Every recovery log as arrays, loaded the first time statistics
+        # are asked for and kept up to date by add_recovery_log
+        self.recovery = None
+        # Opened here but used from the database worker thread afterwards;
+        # the worker is the only thread that touches it from then on
+        self.conn = sqlite3.connect(
+            path,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False
+        )
+        self.apply_profile()
+        migrate(self.conn)
+
+    def apply_profile(self):
+        for name, value in PRAGMAS:
+            self.conn.execute(f'PRAGMA {name} = {value}')
+
+    def close(self):
+        # Let SQLite refresh planner statistics for the indexes we used
+        self.conn.execute('PRAGMA optimize')
+        self.conn.close()
+
+    def _fetch(self, row_type, sql, params=()):
+        return [row_type._make(row) for row in self.conn.execute(sql, params)]
+
+    def _fetch_one(self, row_type, sql, params=()):
+        row = self.conn.execute(sql, params).fetchone()
+        return row_type._make(row) if row else None
+
+    def _write(self, table, sql, params=()):
+        with self.conn:
+            cursor = self.conn.execute(sql, params)
+        self.versions[table] += 1
+        return cursor
+
+    def data_version(self, tables):
+        # Changes whenever one of the tables is written through this repository
+        return tuple(self.versions[table] for table in tables)
+
+    def import_file(self, table, path, progress=None):
+        # Bulk import from CSV or JSONL (see importer.py); returns an
+        # ImportResult
+        result = import_path(self.conn, table, path, progress)
+        self.versions[table] += 1
+        if table == 'recovery_logs':
+            # Reloaded from the table the next time it is needed
+            self.recovery = None
+        return result
+
+    # Tasks
+
+    def tasks_page(self, limit, after=None):
+        # after is the (due_day, id) key of the last row already loaded
+        if after is None:
+            return self._fetch(TaskRow, TASKS_FIRST_PAGE, (limit,))
+        return self._fetch(TaskRow, TASKS_AFTER, (*after, limit))
+
+    def tasks_page_before(self, limit, before):
+        # Returned in display order, i.e. ascending like tasks_page
+        rows = self._fetch(TaskRow, TASKS_BEFORE, (*before, limit))
+        rows.reverse()
+        return rows
+
+    def task(self, task_id):
+        return self._fetch_one(Task, TASK_BY_ID, (task_id,))
+
+    def upcoming_tasks(self, first_day):
+        return self._fetch(TaskRow, UPCOMING_TASKS, (first_day,))
+
+    # Dates are passed in as date_codec day numbers; the text column is
+    # derived from them so the two can't disagree
+
+    def add_task(self, title, description, category, priority, due_day, status='pending'):
+        return self._write('tasks', '''
+            INSERT INTO tasks (title, description, category, priority, due_date, due_day, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (title, description, category, priority,
+              format_day(due_day), due_day, status)).lastrowid
+
+    def update_task(self, task_id, title, description, category, priority, due_day):
+        self._write('tasks', '''
+            UPDATE tasks
+            SET title = ?, description = ?, category = ?,
+                priority = ?, due_date = ?, due_day = ?
+            WHERE id = ?
+        ''', (title, description, category, priority,
+              format_day(due_day), due_day, task_id))
+
+    def set_task_status(self, task_id, status):
+        self._write('tasks', 'UPDATE tasks SET status = ? WHERE id = ?', (status, task_id))
+
+    def delete_task(self, task_id):
+        self._write('tasks', 'DELETE FROM tasks WHERE id = ?', (task_id,))
+
+    def task_totals(self):
+        return self._fetch_one(TaskTotals, TASK_TOTALS)
+
+    def task_category_stats(self):
+        return self._fetch(CategoryStats, TASK_CATEGORY_STATS)
+
+    # Goals
+
+    def goals(self):
+        return self._fetch(GoalRow, GOALS_BY_TARGET_DAY)
+
+    def goal(self, goal_id):
+        return self._fetch_one(Goal, GOAL_BY_ID, (goal_id,))
+
+    def all_goals(self):
+        return self._fetch(Goal, ALL_GOALS)
+
+    def add_goal(self, title, description, target_day, progress):
+        return self._write('goals', '''
+            INSERT INTO goals (title, description, target_date, target_day, progress)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (title, description, format_day(target_day), target_day, progress)).lastrowid
+
+    def update_goal(self, goal_id, title, description, target_day):
+        self._write('goals', '''
+            UPDATE goals
+            SET title = ?, description = ?, target_date = ?, target_day = ?
+            WHERE id = ?
+        ''', (title, description, format_day(target_day), target_day, goal_id))
+
+    def set_goal_progress(self, goal_id, progress):
+        self._write('goals', 'UPDATE goals SET progress = ? WHERE id = ?', (progress, goal_id))
+
+    def delete_goal(self, goal_id):
+        self._write('goals', 'DELETE FROM goals WHERE id = ?', (goal_id,))
+
+    # Routines
+
+    def routines(self):
+        return self._fetch(Routine, ALL_ROUTINES)
+
+    def add_routine(self, title, frequency, time, day_mask, color, start_day):
+        return self._write('routines', '''
+            INSERT INTO routines (title, frequency, time, day_mask, color, start_day)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (title, frequency, time, day_mask, color, start_day)).lastrowid
+
+    def routine_streaks(self):
+        # RoutineStreak by routine id, for routines completed at least once
+        return {streak.routine_id: streak
+                for streak in self._fetch(RoutineStreak, ROUTINE_STREAKS)}
+
+    def complete_routine(self, routine_id, day, completed_at):
+        # Records the routine as done on a day number; completed_at is a
+        # datetime kept for its time of day. Returns the updated
+        # RoutineStreak. Completing the same day twice changes nothing.
+        with self.conn:
+            inserted = self.conn.execute('''
+                INSERT OR IGNORE INTO routine_completions (routine_id, day, completed_at)
+                VALUES (?, ?, ?)
+            ''', (routine_id, day, completed_at.strftime('%Y-%m-%d %H:%M:%S'))).rowcount
+            streak = self._fetch_one(RoutineStreak, ROUTINE_STREAK, (routine_id,))
+            if inserted:
+                routine = self._fetch_one(Routine, ROUTINE_BY_ID, (routine_id,))
+                if streak and day > streak.last_day:
+                    # The usual case: today's completion extends the summary
+                    streak = extend_streak(streak, routine, day)
+                else:
+                    # First completion, or one filled in for an earlier day
+                    streak = self._rebuild_streak(routine)
+                self._save_streak(streak)
+        self.versions['routine_completions'] += 1
+        return streak
+
+    def undo_completion(self, routine_id, day):
+        # Completions are never overwritten; undoing one is the only delete
+        with self.conn:
+            self.conn.execute('''
+                DELETE FROM routine_completions WHERE routine_id = ? AND day = ?
+            ''', (routine_id, day))
+            streak = self._rebuild_streak(self._fetch_one(Routine, ROUTINE_BY_ID, (routine_id,)))
+            if streak.completions:
+                self._save_streak(streak)
+            else:
+                self.conn.execute('DELETE FROM routine_streaks WHERE routine_id = ?', (routine_id,))
+                streak = None
+        self.versions['routine_completions'] += 1
+        return streak
+
+    def _rebuild_streak(self, routine):
+        days = [day for day, in self.conn.execute(COMPLETION_DAYS, (routine.id,))]
+        return rebuild_streak(RoutineStreak(routine.id, 0, 0, 0, 0), routine, days)
+
+    def _save_streak(self, streak):
+        self.conn.execute('''
+            INSERT INTO routine_streaks (routine_id, current, longest, last_day, completions)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (routine_id) DO UPDATE SET
+                current = excluded.current,
+                longest = excluded.longest,
+                last_day = excluded.last_day,
+                completions = excluded.completions
+        ''', streak)
+
+    # Calendar
+
+    def day_activity(self, first_day, last_day):
+        # DayActivity by day number, for days that have any
+        activity = {}
+        for field, day, value in self.conn.execute(DAY_ACTIVITY, (first_day, last_day) * 3):
+            row = activity.get(day) or DayActivity(day, 0, 0, None, frozenset())
+            if field == 'completed':
+                completed = frozenset(int(routine_id) for routine_id in value.split(','))
+                row = row._replace(completions=len(completed), completed=completed)
+            else:
+                row = row._replace(**{field: value})
+            activity[day] = row
+        return activity
+
+    # Recovery
+
+    def recovery_points(self):
+        return self._fetch(RecoveryPoint, RECOVERY_POINTS)
+
+    def recovery_stats(self, first_day, last_day):
+        # RecoverySummary for the days between two day numbers (inclusive)
+        if self.recovery is None:
+            self.recovery = RecoveryHistory()
+            self.recovery.load(self.conn.execute(RECOVERY_HISTORY))
+        return self.recovery.summary(first_day, last_day)
+
+    def add_recovery_log(self, day, energy_level, sleep_hours,
+                         physical_activity, recovery_activity, notes):
+        log_id = self._write('recovery_logs', '''
+            INSERT INTO recovery_logs
+            (date, day, energy_level, sleep_hours, physical_activity, recovery_activity, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (format_day(day), day, energy_level, sleep_hours,
+              physical_activity, recovery_activity, notes)).lastrowid
+        if self.recovery is not None and day:
+            self.recovery.add(day, energy_level, sleep_hours, physical_activity, recovery_activity)
+        return log_id
+
+
+if __name__ == "__main__":
+    import sys
+
+    repo = Repository(sys.argv[1] if len(sys.argv) > 1 else DATABASE_PATH)
+    try:
+        verify_query_plans(repo.conn)
+        print(f"{len(QUERIES)} registered queries use an index")
+    finally:
+        repo.close()
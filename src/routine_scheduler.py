@@ -1,9 +1,26 @@
 import tkinter as tk
-from tkinter import ttk
 import customtkinter as ctk
 from datetime import datetime, timedelta
 import calendar
-import sv_ttk
+from collections import namedtuple
+from repository import Routine
+from recurrence import OccurrenceIndex, WEEKDAYS, completion_rate, current_streak
+
+CALENDAR_CELLS = 6 * 7
+
+# Day cell overlay: the ring colour shows how much is due that day (tasks
+# plus routine occurrences) relative to the busiest day of the month, the
+# day number turns red/amber/green with the recovery energy logged, and a
+# check mark means a routine was completed
+HEAT_COLORS = ("#C8E6C9", "#81C784", "#43A047", "#1B5E20")
+ENERGY_COLORS = ((3, "#E57373"), (6, "#FFB74D"))
+HIGH_ENERGY_COLOR = "#81C784"
+
+# Routines list: only the rows in view have widgets, and those are reused
+# as the list scrolls or changes
+ROW_HEIGHT = 44
+ROUTINE_COLOR = "#4CAF50"
+RoutineItem = namedtuple('RoutineItem', 'routine done enabled streak')
 
 class ModernCalendar(ctk.CTkFrame):
     def __init__(self, parent, *args, **kwargs):
@@ -11,6 +28,9 @@ class ModernCalendar(ctk.CTkFrame):
         self.date = datetime.now()
         self.selected_date = self.date
         self.callback = None
+        self.month_callback = None
+        self.activity = {}
+        self.max_load = 0
         self.setup_calendar()
 
     def setup_calendar(self):
@@ -56,96 +76,352 @@ class ModernCalendar(ctk.CTkFrame):
                 font=("Helvetica", 12, "bold")
             ).grid(row=0, column=i, pady=5)
 
-        # Calendar days
+        # Calendar days: the 6x7 grid of buttons is built once, and changing
+        # the month or the selection only reconfigures the cells that change
         self.days_frame = ctk.CTkFrame(self)
         self.days_frame.pack(fill=tk.BOTH, expand=True)
-        self.update_calendar()
-
-    def update_calendar(self):
-        # Clear previous calendar
-        for widget in self.days_frame.winfo_children():
-            widget.destroy()
-
-        # Configure grid
         for i in range(7):
             self.days_frame.grid_columnconfigure(i, weight=1)
 
-        # Get calendar for current month
-        cal = calendar.monthcalendar(self.date.year, self.date.month)
-        
+        self.day_buttons = []
+        self.cell_dates = [None] * CALENDAR_CELLS
+        self.first_weekday = 0
+        for cell in range(CALENDAR_CELLS):
+            btn = ctk.CTkButton(
+                self.days_frame,
+                text="",
+                width=40,
+                height=40,
+                corner_radius=20,
+                fg_color="transparent",
+                hover_color="#e0e0e0",
+                command=lambda c=cell: self.select_cell(c)
+            )
+            btn.grid(row=cell // 7, column=cell % 7, padx=2, pady=2)
+            btn.grid_remove()
+            self.day_buttons.append(btn)
+
+        # Options each cell was built with; restyle_cell() only configures
+        # the ones that differ
+        self.text_color = self.day_buttons[0].cget("text_color")
+        built_style = {
+            "text": "",
+            "fg_color": "transparent",
+            "hover_color": "#e0e0e0",
+            "border_width": 0,
+            "border_color": HEAT_COLORS[0],
+            "text_color": self.text_color,
+        }
+        self.cell_styles = [built_style] * CALENDAR_CELLS
+
+        self.update_calendar()
+
+    def update_calendar(self):
         # Update header
         self.header_label.configure(text=self.date.strftime("%B %Y"))
 
-        # Create day buttons
-        for week_num, week in enumerate(cal):
-            for day_num, day in enumerate(week):
-                if day != 0:
-                    day_date = datetime(self.date.year, self.date.month, day)
-                    
-                    # Style for current day
-                    if day_date.date() == datetime.now().date():
-                        fg_color = "#4CAF50"
-                        hover_color = "#45a049"
-                    else:
-                        fg_color = "transparent"
-                        hover_color = "#e0e0e0"
-
-                    # Style for selected day
-                    if day_date.date() == self.selected_date.date():
-                        fg_color = "#2196F3"
-                        hover_color = "#1976D2"
-
-                    btn = ctk.CTkButton(
-                        self.days_frame,
-                        text=str(day),
-                        width=40,
-                        height=40,
-                        corner_radius=20,
-                        fg_color=fg_color,
-                        hover_color=hover_color,
-                        command=lambda d=day_date: self.select_date(d)
-                    )
-                    btn.grid(row=week_num, column=day_num, padx=2, pady=2)
+        self.first_weekday, month_length = calendar.monthrange(self.date.year, self.date.month)
+        for cell in range(CALENDAR_CELLS):
+            day = cell - self.first_weekday + 1
+            if 1 <= day <= month_length:
+                self.show_cell(cell, datetime(self.date.year, self.date.month, day))
+            else:
+                self.show_cell(cell, None)
+
+    def show_cell(self, cell, day_date):
+        button = self.day_buttons[cell]
+        old_date = self.cell_dates[cell]
+        self.cell_dates[cell] = day_date
+        if day_date is None:
+            if old_date is not None:
+                button.grid_remove()
+            return
+        if old_date is None:
+            button.grid()
+        self.restyle_cell(cell)
+
+    def set_activity(self, activity):
+        # activity maps day numbers to (load, completions, energy)
+        self.activity = activity
+        self.max_load = max((load for load, _, _ in activity.values()), default=0)
+        for cell in range(CALENDAR_CELLS):
+            self.restyle_cell(cell)
+
+    def cell_style(self, day_date):
+        # Style for selected day
+        if day_date.date() == self.selected_date.date():
+            fg_color, hover_color = "#2196F3", "#1976D2"
+        # Style for current day
+        elif day_date.date() == datetime.now().date():
+            fg_color, hover_color = "#4CAF50", "#45a049"
+        else:
+            fg_color, hover_color = "transparent", "#e0e0e0"
+
+        load, completions, energy = self.activity.get(day_date.toordinal(), (0, 0, None))
+        heat = HEAT_COLORS[0]
+        if load:
+            heat = HEAT_COLORS[(load * len(HEAT_COLORS) - 1) // self.max_load]
+        text_color = self.text_color
+        if energy is not None:
+            text_color = HIGH_ENERGY_COLOR
+            for limit, color in ENERGY_COLORS:
+                if energy <= limit:
+                    text_color = color
+                    break
+
+        return {
+            "text": f"{day_date.day}✓" if completions else str(day_date.day),
+            "fg_color": fg_color,
+            "hover_color": hover_color,
+            "border_width": 2 if load else 0,
+            "border_color": heat,
+            "text_color": text_color,
+        }
+
+    def restyle_cell(self, cell):
+        day_date = self.cell_dates[cell]
+        if day_date is None:
+            return
+        style = self.cell_style(day_date)
+        old_style = self.cell_styles[cell]
+        changes = {key: value for key, value in style.items() if old_style[key] != value}
+        if changes:
+            self.day_buttons[cell].configure(**changes)
+            self.cell_styles[cell] = style
+
+    def cell_of(self, day_date):
+        # Grid cell showing a date, or None if it isn't in the visible month
+        if (day_date.year, day_date.month) != (self.date.year, self.date.month):
+            return None
+        return self.first_weekday + day_date.day - 1
+
+    def select_cell(self, cell):
+        self.select_date(self.cell_dates[cell])
 
     def select_date(self, date):
+        old_cell = self.cell_of(self.selected_date)
         self.selected_date = date
+        # Only the previously and newly selected cells change
+        for cell in (old_cell, self.cell_of(date)):
+            if cell is not None:
+                self.restyle_cell(cell)
         if self.callback:
             self.callback(date)
-        self.update_calendar()
 
     def prev_month(self):
         self.date = self.date.replace(day=1) - timedelta(days=1)
         self.update_calendar()
+        self.month_changed()
 
     def next_month(self):
         self.date = self.date.replace(day=28) + timedelta(days=5)
         self.date = self.date.replace(day=1)
         self.update_calendar()
+        self.month_changed()
+
+    def month_changed(self):
+        if self.month_callback:
+            self.month_callback(self.date.year, self.date.month)
+
+class RoutineRow:
+    # One pooled row of the routines list. bind() points it at another
+    # item and reconfigures only the widgets whose content changed.
+    def __init__(self, parent, toggle_callback):
+        self.index = None
+        self.item = None
+        self.frame = ctk.CTkFrame(parent, height=ROW_HEIGHT - 6)
+        self.frame.pack_propagate(False)
+
+        self.done_var = tk.BooleanVar()
+        self.checkbox = ctk.CTkCheckBox(
+            self.frame,
+            text="",
+            variable=self.done_var,
+            command=lambda: toggle_callback(self.index, self.done_var.get())
+        )
+        self.checkbox.pack(side=tk.LEFT, padx=10)
+
+        self.color_indicator = ctk.CTkButton(
+            self.frame,
+            text="",
+            width=20,
+            height=20,
+            fg_color=ROUTINE_COLOR
+        )
+        self.color_indicator.pack(side=tk.LEFT, padx=5)
+
+        self.title_label = ctk.CTkLabel(self.frame, text="", font=("Helvetica", 12))
+        self.title_label.pack(side=tk.LEFT, padx=5)
+
+        self.time_label = ctk.CTkLabel(self.frame, text="", font=("Helvetica", 10))
+        self.time_label.pack(side=tk.RIGHT, padx=10)
+
+        self.streak_label = ctk.CTkLabel(self.frame, text="", font=("Helvetica", 10))
+        self.streak_label.pack(side=tk.RIGHT, padx=5)
+
+    def bind(self, index, item):
+        self.index = index
+        old = self.item
+        if item == old:
+            return
+        self.item = item
+        routine = item.routine
+        if old is None or routine.color != old.routine.color:
+            self.color_indicator.configure(fg_color=routine.color or ROUTINE_COLOR)
+        if old is None or routine.title != old.routine.title:
+            self.title_label.configure(text=routine.title)
+        if old is None or routine.time != old.routine.time:
+            self.time_label.configure(text=routine.time)
+        if old is None or item.streak != old.streak:
+            self.streak_label.configure(text=item.streak)
+        if old is None or item.enabled != old.enabled:
+            self.checkbox.configure(state="normal" if item.enabled else "disabled")
+        if self.done_var.get() != item.done:
+            self.done_var.set(item.done)
+
+
+# RoutineLists alive in each Tk interpreter. bind_all applies to the whole
+# interpreter, so the wheel is bound there once and handed to the lists;
+# a list drops out of its set when destroyed, and the binding holds no
+# reference to any list.
+wheel_lists = {}
+
+
+def track_wheel(routine_list):
+    lists = wheel_lists.get(routine_list.tk)
+    if lists is None:
+        lists = wheel_lists[routine_list.tk] = set()
+
+        def forward(event):
+            for target in list(lists):
+                target.on_wheel(event)
+
+        # Bound on the window rather than a CTk widget, whose bind_all
+        # raises; add="+" leaves CTk's own wheel handlers in place
+        window = routine_list.winfo_toplevel()
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            window.bind_all(sequence, forward, add="+")
+    lists.add(routine_list)
+
+
+class RoutineList(ctk.CTkFrame):
+    # A scrolling list of RoutineItems that keeps widgets only for the rows
+    # that fit in view. Scrolling moves the first visible index and rebinds
+    # the pooled rows; CTkScrollableFrame would need a widget per routine,
+    # since its inner frame grows to fit everything packed into it.
+    def __init__(self, parent, toggle_callback, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        self.toggle_callback = toggle_callback
+        self.items = []
+        self.first = 0
+        self.visible = 0
+        self.rows = []
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.body.bind("<Configure>", self.on_resize)
+        # The wheel scrolls the list while the pointer is over it. Enter and
+        # Leave on the frame would miss the rows placed over it, so every
+        # wheel event is checked against where the pointer is instead.
+        track_wheel(self)
+
+    def destroy(self):
+        wheel_lists.get(self.tk, set()).discard(self)
+        super().destroy()
+
+    def contains_pointer(self, event):
+        try:
+            widget = self.winfo_containing(event.x_root, event.y_root)
+        except KeyError:
+            # Tk widgets tkinter doesn't know about, e.g. inside dialogs
+            return False
+        path = str(self)
+        return widget is not None and (str(widget) == path or str(widget).startswith(path + "."))
+
+    def set_items(self, items):
+        self.items = items
+        self.scroll_to(self.first)
+
+    def update_item(self, index, item):
+        # Only the row showing this item, if any, is touched
+        self.items[index] = item
+        position = index - self.first
+        if 0 <= position < self.visible:
+            self.rows[position].bind(index, item)
+
+    def on_resize(self, event):
+        visible = max(1, event.height // ROW_HEIGHT + 1)
+        while len(self.rows) < visible:
+            self.rows.append(RoutineRow(self.body, self.on_toggle))
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.first)
+
+    def on_toggle(self, index, done):
+        if index is not None:
+            self.toggle_callback(self.items[index], done)
+
+    def on_wheel(self, event):
+        if not self.contains_pointer(event):
+            return
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.first - 1)
+        else:
+            self.scroll_to(self.first + 1)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * len(self.items)))
+        elif unit == "pages":
+            self.scroll_to(self.first + int(amount) * max(1, self.visible - 1))
+        else:
+            self.scroll_to(self.first + int(amount))
+
+    def scroll_to(self, first):
+        # The last row may be cut off, so a full list scrolls far enough to
+        # show it whole
+        last_first = max(0, len(self.items) - max(1, self.visible - 1))
+        self.first = min(max(0, first), last_first)
+        for position, row in enumerate(self.rows):
+            index = self.first + position
+            if position < self.visible and index < len(self.items):
+                row.bind(index, self.items[index])
+                row.frame.place(x=0, y=position * ROW_HEIGHT, relwidth=1)
+            else:
+                row.index = None
+                row.frame.place_forget()
+
+        if self.items:
+            end = min(len(self.items), self.first + self.visible)
+            self.scrollbar.set(self.first / len(self.items), end / len(self.items))
+        else:
+            self.scrollbar.set(0, 1)
+
 
 class RoutineScheduler:
-    def __init__(self, parent, conn):
+    # tasks and recovery_logs feed the calendar overlay
+    tables = ('routines', 'routine_completions', 'tasks', 'recovery_logs')
+
+    def __init__(self, parent, db, reminders):
         self.parent = parent
-        self.conn = conn
-        self.cursor = conn.cursor()
+        self.db = db
+        self.reminders = reminders
+        self.occurrences = OccurrenceIndex()
+        # RoutineStreak by routine id
+        self.streaks = {}
+        # Date the routines list shows, and list positions by routine id
+        self.shown_date = None
+        self.item_index = {}
+        # (year, month) -> (data version, day activity, completed routine ids
+        # by day) for months already shown
+        self.month_activity = {}
         
-        self.setup_database()
         self.setup_ui()
         self.load_routines()
 
-    def setup_database(self):
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS routines (
-                id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                frequency TEXT,
-                time TEXT,
-                days TEXT,
-                last_completed TEXT,
-                color TEXT
-            )
-        ''')
-        self.conn.commit()
-
     def setup_ui(self):
         # Main container with modern styling
         self.main_container = ctk.CTkFrame(self.parent)
@@ -159,6 +435,7 @@ class RoutineScheduler:
         self.calendar = ModernCalendar(left_panel)
         self.calendar.pack(fill=tk.BOTH, expand=True, pady=(0, 20))
         self.calendar.callback = self.on_date_selected
+        self.calendar.month_callback = self.on_month_changed
 
         # Routines list with modern styling
         list_frame = ctk.CTkFrame(left_panel)
@@ -168,11 +445,12 @@ class RoutineScheduler:
         header_frame = ctk.CTkFrame(list_frame)
         header_frame.pack(fill=tk.X, pady=(0, 10))
 
-        ctk.CTkLabel(
+        self.list_title = ctk.CTkLabel(
             header_frame,
             text="Today's Routines",
             font=("Helvetica", 16, "bold")
-        ).pack(side=tk.LEFT)
+        )
+        self.list_title.pack(side=tk.LEFT)
 
         ctk.CTkButton(
             header_frame,
@@ -183,8 +461,8 @@ class RoutineScheduler:
         ).pack(side=tk.RIGHT)
 
         # Routines list
-        self.routines_frame = ctk.CTkScrollableFrame(list_frame)
-        self.routines_frame.pack(fill=tk.BOTH, expand=True)
+        self.routine_list = RoutineList(list_frame, self.toggle_routine)
+        self.routine_list.pack(fill=tk.BOTH, expand=True)
 
     def show_add_routine_dialog(self):
         dialog = ctk.CTkToplevel(self.parent)
@@ -234,10 +512,9 @@ class RoutineScheduler:
         days_frame = ctk.CTkFrame(dialog)
         days_frame.pack(pady=(0, 15))
         
-        days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        day_vars = [tk.BooleanVar() for _ in days]
+        day_vars = [tk.BooleanVar() for _ in WEEKDAYS]
         
-        for day, var in zip(days, day_vars):
+        for day, var in zip(WEEKDAYS, day_vars):
             ctk.CTkCheckBox(
                 days_frame,
                 text=day,
@@ -262,24 +539,29 @@ class RoutineScheduler:
             ).pack(side=tk.LEFT, padx=5)
 
         def save_routine():
-            selected_days = ','.join(
-                day for day, var in zip(days, day_vars) if var.get()
-            )
+            day_mask = sum(1 << i for i, var in enumerate(day_vars) if var.get())
             
             time = f"{hour_var.get()}:{minute_var.get()}"
-            
-            self.cursor.execute('''
-                INSERT INTO routines (title, frequency, time, days, color)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
+            routine = Routine(
+                None,
                 title_entry.get(),
                 frequency_var.get(),
                 time,
-                selected_days,
-                color_var.get()
-            ))
-            self.conn.commit()
-            self.load_routines()
+                day_mask,
+                color_var.get(),
+                datetime.now().toordinal()
+            )
+            
+            self.db.submit(
+                'add_routine',
+                routine.title,
+                routine.frequency,
+                routine.time,
+                routine.day_mask,
+                routine.color,
+                routine.start_day,
+                callback=lambda routine_id: self.routine_added(routine._replace(id=routine_id))
+            )
             dialog.destroy()
 
         ctk.CTkButton(
@@ -290,59 +572,147 @@ class RoutineScheduler:
             hover_color="#45a049"
         ).pack(pady=20)
 
-    def on_date_selected(self, date):
-        self.load_routines(date)
-
-    def load_routines(self, date=None):
-        if date is None:
-            date = datetime.now()
-
-        # Clear existing routines
-        for widget in self.routines_frame.winfo_children():
-            widget.destroy()
-
-        # Load routines for selected date
-        self.cursor.execute('SELECT * FROM routines')
-        routines = self.cursor.fetchall()
+    def refresh(self):
+        self.load_routines()
 
-        for routine in routines:
-            routine_frame = ctk.CTkFrame(self.routines_frame)
-            routine_frame.pack(fill=tk.X, pady=5)
+    def routine_added(self, routine):
+        self.reminders.schedule_routine(routine)
+        self.refresh()
 
-            complete_btn = ctk.CTkCheckBox(
-                routine_frame,
-                text="",
-                command=lambda r=routine: self.toggle_routine(r)
-            )
-            complete_btn.pack(side=tk.LEFT, padx=10)
-
-            color_indicator = ctk.CTkButton(
-                routine_frame,
-                text="",
-                width=20,
-                height=20,
-                fg_color=routine[6] or "#4CAF50"
-            )
-            color_indicator.pack(side=tk.LEFT, padx=5)
+    def on_date_selected(self, date):
+        # Served from the occurrence index; no query needed
+        self.show_routines(date)
+
+    def on_month_changed(self, year, month):
+        # Builds the index for the month now on screen
+        self.occurrences.month_index(year, month)
+        self.load_activity(year, month)
+
+    def load_activity(self, year, month):
+        # One grouped query per month, reused until one of the tables changes
+        version = self.db.data_version(self.tables)
+        cached = self.month_activity.get((year, month))
+        if cached is not None and cached[0] == version:
+            self.show_activity(year, month)
+            return
+
+        first = datetime(year, month, 1).toordinal()
+        last = first + calendar.monthrange(year, month)[1] - 1
+        self.db.submit(
+            'day_activity', first, last,
+            callback=lambda activity: self.cache_activity(year, month, version, activity)
+        )
 
-            ctk.CTkLabel(
-                routine_frame,
-                text=routine[1],
-                font=("Helvetica", 12)
-            ).pack(side=tk.LEFT, padx=5)
+    def cache_activity(self, year, month, version, activity):
+        # Completed routine ids by day are kept as sets of their own, so a
+        # toggle can patch them without waiting for the month to reload
+        completed = {day: set(row.completed) for day, row in activity.items() if row.completed}
+        self.month_activity[(year, month)] = (version, activity, completed)
+        self.show_activity(year, month)
+        selected = self.calendar.selected_date
+        if (selected.year, selected.month) == (year, month):
+            self.show_routines(selected)
+
+    def completed_on(self, day_date):
+        # Routine ids completed on a date, from the month's cached overlay
+        cached = self.month_activity.get((day_date.year, day_date.month))
+        if cached is None:
+            return set()
+        return cached[2].get(day_date.toordinal(), set())
+
+    def show_activity(self, year, month):
+        if (year, month) != (self.calendar.date.year, self.calendar.date.month):
+            # The user has moved on to another month
+            return
+        _, activity, _ = self.month_activity[(year, month)]
+        occurrences = self.occurrences.month_index(year, month)
+        overlay = {}
+        for day in activity.keys() | occurrences.keys():
+            row = activity.get(day)
+            load = len(occurrences.get(day, ()))
+            if row is None:
+                overlay[day] = (load, 0, None)
+            else:
+                overlay[day] = (load + row.tasks_due, row.completions, row.energy)
+        self.calendar.set_activity(overlay)
+
+    def load_routines(self):
+        # The worker runs these in order, so the streaks are in place by the
+        # time the routines are shown
+        self.db.submit('routine_streaks', callback=self.set_streaks)
+        self.db.submit('routines', callback=self.set_routines)
+
+    def set_streaks(self, streaks):
+        self.streaks = streaks
+
+    def set_routines(self, routines):
+        self.occurrences.set_routines(routines)
+        self.show_routines(self.calendar.selected_date)
+        self.load_activity(self.calendar.date.year, self.calendar.date.month)
+
+    def show_routines(self, date):
+        if date.date() == datetime.now().date():
+            self.list_title.configure(text="Today's Routines")
+        else:
+            self.list_title.configure(text=date.strftime("Routines for %b %d"))
+
+        # Rebinding the pooled rows is all a new day costs
+        self.shown_date = date
+        today = datetime.now().toordinal()
+        completed = self.completed_on(date)
+        items = [self.routine_item(routine, date, completed, today)
+                 for routine in self.occurrences.on(date.date())]
+        self.item_index = {item.routine.id: i for i, item in enumerate(items)}
+        self.routine_list.set_items(items)
+
+    def routine_item(self, routine, date, completed, today):
+        return RoutineItem(
+            routine,
+            routine.id in completed,
+            # Days that haven't come yet can't be ticked off
+            date.toordinal() <= today,
+            self.streak_text(routine, today)
+        )
 
-            ctk.CTkLabel(
-                routine_frame,
-                text=routine[3],
-                font=("Helvetica", 10)
-            ).pack(side=tk.RIGHT, padx=10)
-
-    def toggle_routine(self, routine):
-        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.cursor.execute('''
-            UPDATE routines 
-            SET last_completed = ?
-            WHERE id = ?
-        ''', (now, routine[0]))
-        self.conn.commit()
-        self.load_routines()
\ No newline at end of file
+    def streak_text(self, routine, today):
+        streak = self.streaks.get(routine.id)
+        current = current_streak(streak, routine, today)
+        rate = completion_rate(streak, routine, today)
+        return f"🔥 {current}  {rate:.0%}"
+
+    def toggle_routine(self, item, done):
+        routine, date = item.routine, self.shown_date
+        day = date.toordinal()
+        if done:
+            self.db.submit('complete_routine', routine.id, day, datetime.now(),
+                           callback=lambda streak: self.routine_toggled(routine, date, done, streak))
+        else:
+            self.db.submit('undo_completion', routine.id, day,
+                           callback=lambda streak: self.routine_toggled(routine, date, done, streak))
+
+    def routine_toggled(self, routine, date, done, streak):
+        # Only this routine's streak and the day's completions change, so
+        # they are patched in place and only its row is redrawn
+        if streak is None:
+            self.streaks.pop(routine.id, None)
+        else:
+            self.streaks[routine.id] = streak
+        if done:
+            self.reminders.routine_completed(routine, date.toordinal())
+
+        cached = self.month_activity.get((date.year, date.month))
+        if cached is not None:
+            completed = cached[2].setdefault(date.toordinal(), set())
+            if done:
+                completed.add(routine.id)
+            else:
+                completed.discard(routine.id)
+
+        index = self.item_index.get(routine.id)
+        if date == self.shown_date and index is not None:
+            item = self.routine_list.items[index]
+            self.routine_list.update_item(index, item._replace(
+                done=done,
+                streak=self.streak_text(routine, datetime.now().toordinal())
+            ))
+        self.load_activity(self.calendar.date.year, self.calendar.date.month)
\ No newline at end of file
@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+SECTIONS = ('tasks', 'goals', 'routines', 'recovery', 'analytics')
+
+# Startup budget in milliseconds: time until the main window has painted,
+# and time from clicking a section until its data and charts are showing
+STARTUP_BUDGET_MS = {
+    'first_window': 400,
+    'tasks': 150,
+    'goals': 600,
+    'routines': 400,
+    'recovery': 500,
+    'analytics': 800,
+}
+
+# A section that hasn't finished loading after this long fails the run
+SECTION_TIMEOUT_S = 30
+
+# Runs in a fresh interpreter per measurement so every number is a cold
+# start. Marker lines on stderr split the -X importtime output into phases.
+# A section counts as open once nothing it asked the database worker or the
+# render processes for is still outstanding. A chart waiting for its canvas
+# to be laid out only asks after the next update, hence the second check.
+CHILD_SCRIPT = '''
+import json, sys, time
+launched = float(sys.argv[1])
+section = sys.argv[2]
+timeout = float(sys.argv[3])
+
+from main import ModernApp
+app = ModernApp(prewarm_imports=False)
+app.root.update()
+result = {"first_window": (time.time() - launched) * 1000}
+
+if section != "-":
+    sys.stderr.write("benchmark-phase: " + section + "\\n")
+    sys.stderr.flush()
+    start = time.perf_counter()
+    getattr(app, "show_" + section)()
+    while True:
+        app.root.update()
+        if not app.dispatcher.pending:
+            app.root.update()
+            if not app.dispatcher.pending:
+                break
+        if time.perf_counter() - start > timeout:
+            raise SystemExit(section + " still loading after " + str(timeout) + "s")
+        time.sleep(0.001)
+    result[section] = (time.perf_counter() - start) * 1000
+
+print(json.dumps(result))
+app.root.destroy()
+'''
+
+
+def parse_import_times(stderr):
+    # Self time per top-level package, split by benchmark phase
+    phases = defaultdict(lambda: defaultdict(int))
+    phase = 'first_window'
+    for line in stderr.splitlines():
+        if line.startswith('benchmark-phase: '):
+            phase = line.split(': ', 1)[1]
+            continue
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _cumulative, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        phases[phase][package] += int(self_us)
+    return phases
+
+
+def run_once(section, workdir):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    launched = time.time()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT, str(launched), section,
+         str(SECTION_TIMEOUT_S)],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"Benchmark run for {section!r} failed:\n" + '\n'.join(errors[-20:]))
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    return timings, parse_import_times(proc.stderr)
+
+
+def benchmark(sections, runs):
+    timings = defaultdict(list)
+    imports = defaultdict(lambda: defaultdict(list))
+
+    # Each run uses an empty database in a scratch directory, so the numbers
+    # measure startup cost rather than the size of the user's data
+    for section in sections:
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as workdir:
+                result, phases = run_once(section, workdir)
+            for phase, value in result.items():
+                timings[phase].append(value)
+            for phase, packages in phases.items():
+                for package, self_us in packages.items():
+                    imports[phase][package].append(self_us)
+
+    return timings, imports
+
+
+def report(timings, imports, top):
+    over_budget = False
+    print(f"{'phase':<14}{'median ms':>12}{'budget ms':>12}")
+    for phase in ('first_window',) + SECTIONS:
+        if phase not in timings:
+            continue
+        median = statistics.median(timings[phase])
+        budget = STARTUP_BUDGET_MS[phase]
+        flag = '' if median <= budget else '  OVER BUDGET'
+        over_budget = over_budget or bool(flag)
+        print(f"{phase:<14}{median:>12.1f}{budget:>12}{flag}")
+
+    for phase, packages in imports.items():
+        ranked = sorted(
+            ((statistics.median(values) / 1000, package) for package, values in packages.items()),
+            reverse=True
+        )
+        print(f"\nSlowest imports during {phase} (ms, self time):")
+        for ms, package in ranked[:top]:
+            print(f"  {ms:8.1f}  {package}")
+
+    return over_budget
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the main window and each section")
+    # Checked by hand: argparse tests an empty nargs='*' list against choices
+    # as a single value, so no arguments at all would be rejected
+    parser.add_argument('sections', nargs='*', metavar='section',
+                        help=f"sections to open after the window appears, from {', '.join(SECTIONS)} "
+                             "('-' for none; all of them by default)")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="number of imports to list per phase")
+    args = parser.parse_args()
+    unknown = [section for section in args.sections if section not in SECTIONS + ('-',)]
+    if unknown:
+        parser.error(f"unknown section {unknown[0]!r} (choose from {', '.join(SECTIONS)}, -)")
+
+    timings, imports = benchmark(args.sections or SECTIONS, args.runs)
+    over_budget = report(timings, imports, args.top)
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,37 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
-from datetime import datetime
-import sqlite3
+from bisect import bisect_left
+from repository import TaskRow
+from date_codec import format_day, from_day, to_day
+
+# The list only ever holds a sliding window of WINDOW_PAGES pages. Another
+# page is fetched once the viewport is within PREFETCH_MARGIN (a fraction of
+# the window) of either end, and the page furthest away is dropped.
+PAGE_SIZE = 200
+WINDOW_PAGES = 3
+PREFETCH_MARGIN = 0.15
 
 class TaskManager:
-    def __init__(self, parent, conn):
+    tables = ('tasks',)
+
+    def __init__(self, parent, db, reminders):
         self.parent = parent
-        self.conn = conn
-        self.cursor = conn.cursor()
+        self.db = db
+        self.reminders = reminders
+
+        # Rows currently loaded, keyed by task id (also the Treeview iid),
+        # and their sort keys in display order for finding insert positions
+        self.tasks = {}
+        self.order = []
+        # Whether the loaded window reaches the first/last task in the table
+        self.at_start = True
+        self.at_end = False
+        self.page_check_pending = False
+        # A page request is in flight; generation invalidates pages requested
+        # before the last full reload
+        self.loading = False
+        self.generation = 0
         
         self.setup_ui()
         self.load_tasks()
@@ -25,6 +48,13 @@ class TaskManager:
             command=self.show_add_task_dialog
         )
         add_btn.pack(pady=10)
+
+        refresh_btn = ttk.Button(
+            list_frame,
+            text="Refresh",
+            command=self.load_tasks
+        )
+        refresh_btn.pack(pady=(0, 10))
         
         # Task list
         columns = ('id', 'title', 'category', 'priority', 'due_date', 'status')
@@ -44,9 +74,9 @@ class TaskManager:
         self.task_tree.pack(fill=tk.BOTH, expand=True)
         
         # Scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.task_tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.task_tree.configure(yscrollcommand=scrollbar.set)
+        self.scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.task_tree.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.task_tree.configure(yscrollcommand=self.on_tree_scroll)
 
         # Bind right-click event
         self.task_tree.bind("<Button-3>", self.show_context_menu)
@@ -68,34 +98,28 @@ class TaskManager:
             # Show context menu
             self.context_menu.post(event.x_root, event.y_root)
 
-    def update_task_status(self, status):
+    def selected_task_id(self):
         selected_item = self.task_tree.selection()
         if not selected_item:
+            return None
+        return int(selected_item[0])
+
+    def update_task_status(self, status):
+        task_id = self.selected_task_id()
+        if task_id is None:
             return
         
-        task_id = self.task_tree.item(selected_item[0])['values'][0]
-        
-        self.cursor.execute('''
-            UPDATE tasks 
-            SET status = ?
-            WHERE id = ?
-        ''', (status, task_id))
-        
-        self.conn.commit()
-        self.load_tasks()
+        task = self.tasks[task_id]._replace(status=status)
+        self.db.submit('set_task_status', task_id, status,
+                       callback=lambda _: self.task_saved(task))
 
     def edit_task(self):
-        selected_item = self.task_tree.selection()
-        if not selected_item:
+        task_id = self.selected_task_id()
+        if task_id is None:
             return
-            
-        task_id = self.task_tree.item(selected_item[0])['values'][0]
         
         # Fetch task details
-        self.cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
-        task = self.cursor.fetchone()
-        
-        self.show_edit_task_dialog(task)
+        self.db.submit('task', task_id, callback=self.show_edit_task_dialog)
 
     def show_edit_task_dialog(self, task):
         dialog = tk.Toplevel(self.parent)
@@ -125,39 +149,43 @@ class TaskManager:
         
         ttk.Label(dialog, text="Due Date:").pack(pady=5)
         due_date = DateEntry(dialog)
-        due_date.set_date(datetime.strptime(task[5], '%Y-%m-%d'))
+        if task.due_day:
+            due_date.set_date(from_day(task.due_day))
         due_date.pack(fill=tk.X, padx=20)
         
         def save_changes():
-            self.cursor.execute('''
-                UPDATE tasks 
-                SET title = ?, description = ?, category = ?, 
-                    priority = ?, due_date = ?
-                WHERE id = ?
-            ''', (
+            due_day = to_day(due_date.get_date())
+            row = TaskRow(
+                task.id,
                 title_entry.get(),
-                desc_entry.get(),
                 category_combo.get(),
                 priority_combo.get(),
-                due_date.get(),
-                task[0]
-            ))
-            self.conn.commit()
-            self.load_tasks()
+                format_day(due_day),
+                task.status or 'pending',
+                due_day
+            )
+            self.db.submit(
+                'update_task',
+                task.id,
+                row.title,
+                desc_entry.get(),
+                row.category,
+                row.priority,
+                row.due_day,
+                callback=lambda _: self.task_saved(row)
+            )
             dialog.destroy()
         
         ttk.Button(dialog, text="Save Changes", command=save_changes).pack(pady=20)
 
     def delete_task(self):
-        selected_item = self.task_tree.selection()
-        if not selected_item:
+        task_id = self.selected_task_id()
+        if task_id is None:
             return
             
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this task?"):
-            task_id = self.task_tree.item(selected_item[0])['values'][0]
-            self.cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-            self.conn.commit()
-            self.load_tasks()
+            self.db.submit('delete_task', task_id,
+                           callback=lambda _: self.task_deleted(task_id))
 
     def show_add_task_dialog(self):
         dialog = tk.Toplevel(self.parent)
@@ -186,36 +214,191 @@ class TaskManager:
         due_date.pack(fill=tk.X, padx=20)
         
         def save_task():
-            self.cursor.execute('''
-                INSERT INTO tasks (title, description, category, priority, due_date, status)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
+            due_day = to_day(due_date.get_date())
+            row = TaskRow(
+                None,
                 title_entry.get(),
-                desc_entry.get(),
                 category_combo.get(),
                 priority_combo.get(),
-                due_date.get(),
-                'pending'
-            ))
-            self.conn.commit()
-            self.load_tasks()
+                format_day(due_day),
+                'pending',
+                due_day
+            )
+            self.db.submit(
+                'add_task',
+                row.title,
+                desc_entry.get(),
+                row.category,
+                row.priority,
+                row.due_day,
+                callback=lambda task_id: self.task_saved(row._replace(id=task_id), new=True)
+            )
             dialog.destroy()
         
         ttk.Button(dialog, text="Save", command=save_task).pack(pady=20)
 
+    def refresh(self):
+        self.load_tasks()
+
     def load_tasks(self):
-        # Clear existing items
-        for item in self.task_tree.get_children():
-            self.task_tree.delete(item)
-        
-        # Load tasks from database
-        self.cursor.execute('SELECT * FROM tasks ORDER BY due_date')
-        for task in self.cursor.fetchall():
-            self.task_tree.insert('', tk.END, values=(
-                task[0],  # id
-                task[1],  # title
-                task[3],  # category
-                task[4],  # priority
-                task[5],  # due_date
-                task[6] if task[6] else 'pending'  # status
-            ))
\ No newline at end of file
+        # Full reload back to the top of the list; only used on first load
+        # and the Refresh button. Everything else goes through
+        # insert_row/update_row/remove_row or the paging below.
+        self.task_tree.delete(*self.task_tree.get_children())
+        self.tasks.clear()
+        self.order.clear()
+        self.at_start = True
+        self.at_end = False
+        self.generation += 1
+        self.load_next_page()
+
+    def load_next_page(self):
+        after = self.order[-1] if self.order else None
+        self.loading = True
+        self.db.submit('tasks_page', PAGE_SIZE, after,
+                       callback=lambda page, generation=self.generation:
+                           self.on_next_page(page, generation),
+                       errback=self.on_page_error)
+
+    def on_next_page(self, page, generation):
+        if generation != self.generation:
+            return
+        self.loading = False
+        if len(page) < PAGE_SIZE:
+            self.at_end = True
+
+        top_row = self.top_row()
+        for task in page:
+            if task.id in self.tasks:
+                # Already inserted by a mutation while the page was loading
+                continue
+            self.tasks[task.id] = task
+            self.order.append(self.sort_key(task))
+            self.task_tree.insert('', tk.END, iid=str(task.id), values=task)
+
+        excess = len(self.order) - PAGE_SIZE * WINDOW_PAGES
+        if excess > 0:
+            self.trim_window(excess, from_top=True)
+            self.scroll_to_row(top_row - excess)
+
+    def load_previous_page(self):
+        self.loading = True
+        self.db.submit('tasks_page_before', PAGE_SIZE, self.order[0],
+                       callback=lambda page, generation=self.generation:
+                           self.on_previous_page(page, generation),
+                       errback=self.on_page_error)
+
+    def on_page_error(self, exc):
+        # Let scrolling retry the page, then report the error as usual
+        self.loading = False
+        raise exc
+
+    def on_previous_page(self, page, generation):
+        if generation != self.generation:
+            return
+        self.loading = False
+        if len(page) < PAGE_SIZE:
+            self.at_start = True
+
+        page = [task for task in page if task.id not in self.tasks]
+        top_row = self.top_row()
+        self.order[:0] = [self.sort_key(task) for task in page]
+        for index, task in enumerate(page):
+            self.tasks[task.id] = task
+            self.task_tree.insert('', index, iid=str(task.id), values=task)
+
+        excess = len(self.order) - PAGE_SIZE * WINDOW_PAGES
+        if excess > 0:
+            self.trim_window(excess, from_top=False)
+        # Rows were added above the viewport; keep showing the same rows
+        self.scroll_to_row(top_row + len(page))
+
+    def trim_window(self, count, from_top):
+        # Drop rows that scrolled far out of view
+        if from_top:
+            removed, self.order[:count] = self.order[:count], []
+            self.at_start = False
+        else:
+            removed, self.order[-count:] = self.order[-count:], []
+            self.at_end = False
+
+        for key in removed:
+            del self.tasks[key[1]]
+        self.task_tree.delete(*(str(key[1]) for key in removed))
+
+    def top_row(self):
+        return round(self.task_tree.yview()[0] * len(self.order))
+
+    def scroll_to_row(self, index):
+        # The Treeview only learns its new row count on the next layout pass
+        self.task_tree.update_idletasks()
+        self.task_tree.yview_moveto(max(index, 0) / len(self.order))
+
+    def on_tree_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Defer paging until Tk has finished the scroll that reported this
+        if not self.page_check_pending:
+            self.page_check_pending = True
+            self.task_tree.after_idle(self.check_window, float(first), float(last))
+
+    def check_window(self, first, last):
+        self.page_check_pending = False
+        if self.loading:
+            return
+        if last >= 1.0 - PREFETCH_MARGIN and not self.at_end:
+            self.load_next_page()
+        elif first <= PREFETCH_MARGIN and not self.at_start and self.order:
+            self.load_previous_page()
+
+    def in_window(self, key):
+        # Whether a row with this key belongs inside the loaded window
+        if not self.order:
+            return self.at_start and self.at_end
+        return ((self.at_start or key >= self.order[0])
+                and (self.at_end or key <= self.order[-1]))
+
+    @staticmethod
+    def sort_key(task):
+        # Mirrors ORDER BY due_day, id
+        return (task.due_day, task.id)
+
+    def task_saved(self, task, new=False):
+        self.reminders.schedule_task(task)
+        if new:
+            self.insert_row(task)
+        else:
+            self.update_row(task)
+
+    def task_deleted(self, task_id):
+        self.reminders.cancel_task(task_id)
+        self.remove_row(task_id)
+
+    def insert_row(self, task):
+        key = self.sort_key(task)
+        if not self.in_window(key):
+            # It will be fetched when the user pages to it
+            return
+        index = bisect_left(self.order, key)
+        self.order.insert(index, key)
+        self.tasks[task.id] = task
+        self.task_tree.insert('', index, iid=str(task.id), values=task)
+
+    def update_row(self, task):
+        old_task = self.tasks.get(task.id)
+        if old_task is None:
+            # Paged out while its dialog was open
+            self.insert_row(task)
+        elif self.sort_key(task) != self.sort_key(old_task):
+            # Due date changed, so the row moves to its new position
+            self.remove_row(task.id)
+            self.insert_row(task)
+        else:
+            self.tasks[task.id] = task
+            self.task_tree.item(str(task.id), values=task)
+
+    def remove_row(self, task_id):
+        if task_id not in self.tasks:
+            return
+        task = self.tasks.pop(task_id)
+        del self.order[bisect_left(self.order, self.sort_key(task))]
+        self.task_tree.delete(str(task_id))
@@ -0,0 +1,74 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+
+
+class CachedView:
+    def __init__(self, frame, view, data_version):
+        self.frame = frame
+        self.view = view
+        self.data_version = data_version
+
+
+class ViewCache:
+    # Keeps each section's widgets alive between visits. Hidden sections are
+    # pack_forget()-ed rather than destroyed, and refreshed on the next visit
+    # only if one of the tables they display was written in the meantime.
+    # At most max_views sections are kept; the least recently shown one is
+    # destroyed first (None keeps them all).
+    def __init__(self, parent, db, max_views=None):
+        self.parent = parent
+        self.db = db
+        self.max_views = max_views
+        self.views = OrderedDict()
+        self.current = None
+
+    def show(self, name, view_class, *args):
+        if name == self.current:
+            return
+        self.hide_current()
+
+        entry = self.views.get(name)
+        if entry is None:
+            frame = ttk.Frame(self.parent)
+            frame.pack(fill=tk.BOTH, expand=True)
+            view = view_class(frame, self.db, *args)
+            entry = CachedView(frame, view, None)
+            self.views[name] = entry
+        else:
+            entry.frame.pack(fill=tk.BOTH, expand=True)
+            if entry.data_version != self.db.data_version(entry.view.tables):
+                entry.view.refresh()
+
+        self.views.move_to_end(name)
+        self.current = name
+        self.evict()
+
+    def hide_current(self):
+        if self.current is None:
+            return
+        entry = self.views[self.current]
+        # Anything written while the view was on screen it already shows
+        entry.data_version = self.db.data_version(entry.view.tables)
+        entry.frame.pack_forget()
+        self.current = None
+
+    def evict(self):
+        if self.max_views is None:
+            return
+        while len(self.views) > self.max_views:
+            name = next(iter(self.views))
+            self.discard(name)
+
+    def discard(self, name):
+        entry = self.views.pop(name)
+        if name == self.current:
+            self.current = None
+        close = getattr(entry.view, 'close', None)
+        if close:
+            close()
+        entry.frame.destroy()
+
+    def clear(self):
+        for name in list(self.views):
+            self.discard(name)
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import pytest
+from repository import QUERIES, RegisteredQuery, Repository, query_plan_problems, verify_query_plans
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = Repository(str(tmp_path / 'plans.db'))
+    yield repo
+    repo.close()
+
+
+def test_registered_queries_use_an_index(repo):
+    # A freshly migrated database: every registered query must plan onto
+    # an index without any data to help it
+    assert QUERIES
+    verify_query_plans(repo.conn)
+
+
+@pytest.mark.parametrize('sql, params', [
+    ('SELECT id FROM tasks WHERE title = ?', ('a',)),
+    # A LIMIT doesn't stop a filtered table scan reading everything first
+    ('SELECT id FROM tasks WHERE title = ? LIMIT 5', ('a',)),
+    ('SELECT id FROM tasks ORDER BY title LIMIT 5', ()),
+    ('SELECT id, notes FROM recovery_logs ORDER BY day', ()),
+])
+def test_full_scans_are_reported(repo, sql, params):
+    query = RegisteredQuery('probe', sql, params, frozenset())
+    assert query_plan_problems(repo.conn, query)
+
+
+def test_index_ordered_page_is_allowed(repo):
+    query = RegisteredQuery('probe', 'SELECT id FROM tasks ORDER BY due_day, id LIMIT ?', (10,), frozenset())
+    assert query_plan_problems(repo.conn, query) == []